@@ -1,15 +1,199 @@
+import os
 import sys
-from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QComboBox, QPushButton, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem, QScrollArea, QAbstractItemView, QTabWidget, QInputDialog, QTextEdit, QFormLayout, QFileDialog, QDialog, QDialogButtonBox, QMessageBox, QCheckBox, QSplitter, QGroupBox
-from PyQt5.QtCore import Qt
+import bisect
+from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QComboBox, QPushButton, QVBoxLayout, QHBoxLayout, QListWidget, QListView, QScrollArea, QAbstractItemView, QTabWidget, QInputDialog, QTextEdit, QFormLayout, QFileDialog, QDialog, QDialogButtonBox, QMessageBox, QCheckBox, QSplitter, QGroupBox, QSpinBox
+from PyQt5.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal, QAbstractListModel, QSortFilterProxyModel, QModelIndex
+import time
 import configparser
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
+import graph_layout
+import render
 from backend import *
 
+GROUP_FILE_FILTER = "Group Files (*.json *.ndjson *.jsonl *.snap *.db *.sqlite *.sqlite3)"
+AUTOSAVE_INTERVAL_MS = 30 * 1000
+AUTOSAVE_SUFFIX = '.autosave'
+SUGGESTION_LIMIT = 50
+GRAPH_CLICK_RADIUS = 10
+
+
+def autosave_path(file_name):
+    """Return the recovery file autosave writes for a group file, with the same extension so it is saved in the same format."""
+    root, extension = os.path.splitext(file_name)
+    return root + AUTOSAVE_SUFFIX + extension
+
+
+class AutosaveSignals(QObject):
+    # Sends back the finished task, whose error, mark and version are its result
+    finished = pyqtSignal(object)
+
+
+class AutosaveTask(QRunnable):
+    """Writes a recovery copy of a journaled group file on a worker thread.
+
+    The task only gets the journal position to save up to and a copy of the layouts, which are not
+    journaled: it loads the group file afresh, replays the journal up to 'mark' and saves the result
+    to the file's autosave_path, so the group being edited is never touched off the GUI thread and
+    the group file itself is left as it was. 'signals' belongs to the window, so it outlives the task.
+    """
+    def __init__(self, file_name, mark, version, layouts, signals):
+        super().__init__()
+        self.file_name = file_name
+        self.mark = mark
+        self.version = version
+        self.layouts = layouts
+        self.error = None
+        self.signals = signals
+
+    def run(self):
+        try:
+            group = Group()
+            load_people_from_file(group, self.file_name, journal_end=self.mark)
+            group.layouts = self.layouts
+            group.save_group_to_file(autosave_path(self.file_name))
+        except Exception as error:
+            self.error = error
+        self.signals.finished.emit(self)
+
+
+class LayoutSignals(QObject):
+    # Each sends back (task, positions), or (task, error) if the layout failed
+    progress = pyqtSignal(object, object)
+    finished = pyqtSignal(object, object)
+
+
+class LayoutTask(QRunnable):
+    """Computes a graph layout on a worker thread, sending back the positions as they improve.
+
+    The task only gets plain arrays and a copy of the previous positions, never the group itself.
+    'signals' belongs to the graph tab, so it outlives the task.
+    """
+    def __init__(self, names, sources, targets, previous, signals):
+        super().__init__()
+        self.names = names
+        self.sources = sources
+        self.targets = targets
+        self.previous = previous
+        self.cancelled = False
+        self.signals = signals
+
+    def report(self, positions):
+        if self.cancelled:
+            return False
+        self.signals.progress.emit(self, positions)
+
+    def run(self):
+        try:
+            positions = graph_layout.update_layout(self.names, self.sources, self.targets, self.previous, progress=self.report)
+        except Exception as error:
+            self.signals.finished.emit(self, error)
+        else:
+            self.signals.finished.emit(self, positions)
+
+
+class PersonListModel(QAbstractListModel):
+    """List model of the names in a Group, so the person list only creates views for the rows on screen.
+
+    Names are listed in the order they were added to the group. People added to or removed from
+    the group are passed in by name, and only their rows are inserted or removed. Each name keeps
+    the number it was listed with, and those numbers stay in ascending order down the rows, so a
+    name's row is found by binary search.
+    """
+    def __init__(self, group):
+        super().__init__()
+        self.set_group(group)
+
+    def set_group(self, group):
+        self.beginResetModel()
+        self.group = group
+        self.names = list(group.people)
+        self.numbers = list(range(len(self.names)))
+        self.number_of = dict(zip(self.names, self.numbers))
+        self.next_number = len(self.names)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.names[index.row()]
+        return None
+
+    def row(self, name):
+        """Return the row listing 'name', or None if it is not listed."""
+        number = self.number_of.get(name)
+        return None if number is None else bisect.bisect_left(self.numbers, number)
+
+    def add(self, names):
+        """Append rows for the people in 'names' just added to the group."""
+        new_names = [name for name in dict.fromkeys(names) if name not in self.number_of and name in self.group.people]
+        if new_names:
+            numbers = range(self.next_number, self.next_number + len(new_names))
+            self.next_number += len(new_names)
+            self.beginInsertRows(QModelIndex(), len(self.names), len(self.names) + len(new_names) - 1)
+            self.names.extend(new_names)
+            self.numbers.extend(numbers)
+            self.number_of.update(zip(new_names, numbers))
+            self.endInsertRows()
+
+    def remove(self, names):
+        """Remove the rows of the people in 'names' just removed from the group."""
+        for name in dict.fromkeys(names):
+            if name not in self.number_of or name in self.group.people:
+                continue
+            row = self.row(name)
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.names[row]
+            del self.numbers[row]
+            del self.number_of[name]
+            self.endRemoveRows()
+
+
+class PersonFilterProxy(QSortFilterProxyModel):
+    """Sorts the person list and filters it down to the people a search matched.
+
+    The matches come from the group's name index, so checking a row is a set lookup rather than a
+    search through its name.
+    """
+    def __init__(self):
+        super().__init__()
+        self.setSortCaseSensitivity(Qt.CaseInsensitive)
+        self.query = None
+        self.matches = set()
+
+    def set_search(self, text, matches):
+        """Show only 'matches', the names found for the search 'text', or everyone if text is empty."""
+        self.query = text.lower() if text else None
+        self.matches = set(matches) if text else set()
+        # Mapping every row afresh is cheaper than invalidateFilter splicing in each gap between scattered matches
+        self.invalidate()
+
+    def add(self, names):
+        """Let people about to be added to the list through the search, if their names match it."""
+        if self.query:
+            self.matches.update(name for name in names if self.query in name.lower())
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.query is None or self.sourceModel().names[source_row] in self.matches
+
 
 class PersonWindow(QWidget):
     def __init__(self, group):
         super().__init__()
         self.group = group
         self.last_loaded_file = None 
+        self.journal_mark = group.journal.mark() if group.journal else 0
+        self.autosave_mark = None
+        self.saved_version = group.version
+        self.autosave_pool = QThreadPool()
+        self.autosave_pool.setMaxThreadCount(1)
+        self.autosave_task = None
+        self.autosave_signals = AutosaveSignals()
+        self.autosave_signals.finished.connect(self.autosave_finished)
+        self.disable_compaction()
         self.init_ui()
 
     def init_ui(self):
@@ -33,10 +217,18 @@ class PersonWindow(QWidget):
         sidebar_layout.addWidget(self.search_input)
 
         # Person list
-        self.person_list = QListWidget()
+        self.person_model = PersonListModel(self.group)
+        self.person_proxy = PersonFilterProxy()
+        self.person_proxy.setSourceModel(self.person_model)
+        self.person_list = QListView()
+        self.person_list.setUniformItemSizes(True)
+        self.person_list.setModel(self.person_proxy)
         self.person_list.setSelectionMode(QAbstractItemView.SingleSelection)
-        self.person_list.itemSelectionChanged.connect(self.show_person_details)
+        self.person_list.selectionModel().selectionChanged.connect(self.show_person_details)
         sidebar_layout.addWidget(self.person_list)
+        sort_checkbox = QCheckBox('Sort by name')
+        sort_checkbox.toggled.connect(lambda checked: self.person_proxy.sort(0 if checked else -1))
+        sidebar_layout.addWidget(sort_checkbox)
 
         # Load and Save buttons
         load_button = QPushButton('Load')
@@ -48,6 +240,13 @@ class PersonWindow(QWidget):
         button_layout.addWidget(save_button)
         sidebar_layout.addLayout(button_layout)
 
+        # Autosave status
+        self.save_status = QLabel()
+        sidebar_layout.addWidget(self.save_status)
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.autosave_timer.start(AUTOSAVE_INTERVAL_MS)
+
         sidebar_widget.setLayout(sidebar_layout)
         sidebar_widget.setMaximumWidth(250)  # Set the maximum width for the sidebar
         splitter.addWidget(sidebar_widget)
@@ -56,11 +255,13 @@ class PersonWindow(QWidget):
         self.tab_widget = QTabWidget()
         self.tab_widget.addTab(self.create_scrollable_tab(PersonCreationTab(self)), 'Create Person')
         self.tab_widget.addTab(self.create_scrollable_tab(PersonEditTab(self)), 'Edit Person')
+        self.graph_tab = GraphTab(self)
+        self.tab_widget.addTab(self.graph_tab, 'Graph')
+        self.tab_widget.currentChanged.connect(self.tab_changed)
         splitter.addWidget(self.tab_widget)
 
         layout.addWidget(splitter)
         self.setLayout(layout)
-        self.update_person_list()
 
     def create_scrollable_tab(self, tab_widget):
         scroll_area = QScrollArea()
@@ -68,21 +269,37 @@ class PersonWindow(QWidget):
         scroll_area.setWidget(tab_widget)
         return scroll_area
 
-    def update_person_list(self):
-        self.person_list.clear()
-        for person_name in self.group.people.keys():
-            item = QListWidgetItem(person_name)
-            self.person_list.addItem(item)
+    def update_person_list(self, added=(), removed=()):
+        """Update the person list for the people just added to or removed from the group, by name."""
+        self.person_model.remove(removed)
+        self.person_proxy.add(added)
+        self.person_model.add(added)
 
     def filter_person_list(self, text):
-        for row in range(self.person_list.count()):
-            item = self.person_list.item(row)
-            item.setHidden(text.lower() not in item.text().lower())
+        # Matches come from the group's name index rather than a scan of every row
+        self.person_proxy.set_search(text, self.group.search_names(text) if text else None)
+
+    def select_person(self, person_name):
+        """Select a person in the list, or clear the selection if person_name is None or not listed."""
+        row = self.person_model.row(person_name)
+        if row is not None:
+            source_index = self.person_model.index(row)
+            self.person_list.setCurrentIndex(self.person_proxy.mapFromSource(source_index))
+        else:
+            self.person_list.clearSelection()
+
+    def tab_changed(self, index):
+        if self.tab_widget.widget(index) is self.graph_tab:
+            self.graph_tab.refresh()
+
+    def selected_person(self):
+        selected_indexes = self.person_list.selectionModel().selectedIndexes()
+        return selected_indexes[0].data() if selected_indexes else None
 
     def show_person_details(self):
-        selected_items = self.person_list.selectedItems()
-        if selected_items:
-            person_name = selected_items[0].text()
+        selected_indexes = self.person_list.selectionModel().selectedIndexes()
+        if selected_indexes:
+            person_name = selected_indexes[0].data()
             self.tab_widget.setCurrentIndex(1)
             edit_tab = self.tab_widget.widget(1)
             edit_widget = edit_tab.widget()
@@ -90,32 +307,121 @@ class PersonWindow(QWidget):
             edit_widget.update_relationship_list()
 
     def load_group(self):
-        if self.last_loaded_file:
+        if self.last_loaded_file and self.group.database is not None:
+            # A group kept in a database has nothing to discard, so it is committed without asking
+            self.save_changes(self.last_loaded_file)
+            file_name, _ = QFileDialog.getOpenFileName(self, "Open Group File", "", GROUP_FILE_FILTER)
+            if file_name:
+                self.open_group(file_name)
+        elif self.last_loaded_file:
             reply = QMessageBox.question(self, 'Save Changes', 'Do you want to save your changes before loading a new file?',
                                         QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel, QMessageBox.Yes)
 
             if reply == QMessageBox.Yes:
-                self.group.save_group_to_file(self.last_loaded_file)
+                self.save_changes(self.last_loaded_file)
+            elif reply == QMessageBox.No:
+                self.discard_changes()
 
             if reply != QMessageBox.Cancel:
-                file_name, _ = QFileDialog.getOpenFileName(self, "Open Group File", "", "JSON Files (*.json)")
+                file_name, _ = QFileDialog.getOpenFileName(self, "Open Group File", "", GROUP_FILE_FILTER)
                 if file_name:
-                    self.group = Group(file_name)
-                    self.last_loaded_file = file_name
-                    self.update_person_list()
+                    self.open_group(file_name)
         else:
-            file_name, _ = QFileDialog.getOpenFileName(self, "Open Group File", "", "JSON Files (*.json)")
+            file_name, _ = QFileDialog.getOpenFileName(self, "Open Group File", "", GROUP_FILE_FILTER)
             if file_name:
-                self.group = Group(file_name)
-                self.last_loaded_file = file_name
-                self.update_person_list()
+                self.open_group(file_name)
+
+    def open_group(self, file_name):
+        self.finish_autosave()
+        self.group.close_journal()
+        self.group = Group(file_name, journaled=True, lazy=True)
+        self.journal_mark = self.group.journal.mark() if self.group.journal else 0
+        self.autosave_mark = None
+        self.saved_version = self.group.version
+        self.disable_compaction()
+        self.last_loaded_file = file_name
+        self.person_model.set_group(self.group)
+        self.filter_person_list(self.search_input.text())
+        self.graph_tab.refresh()
+
+    def disable_compaction(self):
+        # Compacting would write unsaved changes into the group file; autosave writes a recovery file off the GUI thread instead
+        if self.group.journal:
+            self.group.compact_bytes = None
+
+    def autosave(self):
+        # Edits since the last autosave are coalesced into one save, and a save still in flight is left to finish
+        if not self.last_loaded_file or self.autosave_task or self.group.version == self.saved_version:
+            return
+        group = self.group
+        if group.database is not None:
+            # A group kept in a database writes its changes as they are made, so it only needs committing
+            group.save_group_to_file(self.last_loaded_file)
+            self.saved_version = group.version
+            self.save_status.setText(f'Autosaved at {time.strftime("%H:%M:%S")}')
+            return
+        if not group.journal:
+            return
+        # Only the journal position and layouts are taken here; the group is rebuilt from its file and journal on the worker
+        layouts = {relationship: dict(positions) for relationship, positions in group.layouts.items()}
+        self.autosave_task = AutosaveTask(self.last_loaded_file, group.journal.mark(), group.version, layouts, self.autosave_signals)
+        self.save_status.setText('Autosaving...')
+        self.autosave_pool.start(self.autosave_task)
+
+    def autosave_finished(self, task):
+        # A task already taken in by finish_autosave still sends its queued signal, which is ignored here
+        if task is not self.autosave_task:
+            return
+        self.autosave_task = None
+        if task.error:
+            self.save_status.setText(f'Autosave failed: {task.error}')
+            return
+        self.saved_version = task.version
+        self.autosave_mark = task.mark
+        self.save_status.setText(f'Autosaved at {time.strftime("%H:%M:%S")}')
+
+    def finish_autosave(self):
+        """Wait for an autosave still in flight and take in its result, before the group or its files change."""
+        self.autosave_pool.waitForDone()
+        if self.autosave_task:
+            self.autosave_finished(self.autosave_task)
+
+    def save_changes(self, file_name):
+        self.finish_autosave()
+        if self.group.journal and file_name == self.last_loaded_file:
+            if self.autosave_mark is not None:
+                # The recovery file holds everything journaled before autosave_mark, so it becomes the group file
+                os.replace(autosave_path(file_name), file_name)
+                self.group.journal.discard_before(self.autosave_mark)
+                self.autosave_mark = None
+            # The remaining changes are recorded in the journal next to the file, so they only need to reach the disk
+            self.group.journal.sync()
+            self.journal_mark = self.group.journal.mark()
+        else:
+            self.group.save_group_to_file(file_name)
+
+    def discard_changes(self):
+        self.finish_autosave()
+        if self.autosave_mark is not None:
+            os.remove(autosave_path(self.last_loaded_file))
+            self.autosave_mark = None
+        if self.group.journal:
+            self.group.journal.rollback(self.journal_mark)
 
     def save_group(self):
-        file_name, _ = QFileDialog.getSaveFileName(self, "Save Group File", "", "JSON Files (*.json)")
+        file_name, _ = QFileDialog.getSaveFileName(self, "Save Group File", "", GROUP_FILE_FILTER)
         if file_name:
             self.group.save_group_to_file(file_name)
     
     def closeEvent(self, event):
+        self.graph_tab.cancel()
+        self.finish_autosave()
+        self.graph_tab.layout_pool.waitForDone()
+        if self.group.database is not None:
+            # Changes to a group kept in a database are written as they are made, so there is nothing to discard
+            self.save_changes(self.group.database.filename)
+            event.accept()
+            return
         reply = QMessageBox.question(self, 'Save Changes', 'Do you want to save your changes?',
                                     QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel, QMessageBox.Yes)
 
@@ -123,19 +429,176 @@ class PersonWindow(QWidget):
             if self.last_loaded_file:
                 file_name = self.last_loaded_file
             else:
-                file_name, _ = QFileDialog.getSaveFileName(self, "Save Group File", "", "JSON Files (*.json)")
+                file_name, _ = QFileDialog.getSaveFileName(self, "Save Group File", "", GROUP_FILE_FILTER)
 
             if file_name:
-                self.group.save_group_to_file(file_name)
+                self.save_changes(file_name)
+                self.group.close_journal()
                 event.accept()
             else:
                 event.ignore()
         elif reply == QMessageBox.No:
+            self.discard_changes()
+            self.group.close_journal()
             event.accept()
         else:
             event.ignore()
 
 
+class GraphTab(QWidget):
+    """Shows a whole relationship graph, or the neighbourhood of the selected person, on an embedded canvas.
+
+    Layouts are computed by a LayoutTask on a worker thread and drawn as they arrive, so the window
+    stays responsive; large graphs are drawn at a lower level of detail by render.draw_graph.
+    Clicking a node shows that person's details.
+    """
+    def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+        self.layout_pool = QThreadPool()
+        self.layout_pool.setMaxThreadCount(1)
+        self.layout_task = None
+        self.layout_target = None
+        self.layout_signals = LayoutSignals()
+        self.layout_signals.progress.connect(self.layout_progress)
+        self.layout_signals.finished.connect(self.layout_finished)
+        self.drawn = None
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel('Relationship:'))
+        self.relationship_type = QComboBox()
+        self.relationship_type.activated.connect(self.refresh)
+        controls.addWidget(self.relationship_type)
+        self.neighborhood_checkbox = QCheckBox('Selected person only, depth')
+        self.neighborhood_checkbox.setChecked(True)
+        self.neighborhood_checkbox.toggled.connect(self.refresh)
+        controls.addWidget(self.neighborhood_checkbox)
+        self.depth_input = QSpinBox()
+        self.depth_input.setRange(1, 5)
+        self.depth_input.valueChanged.connect(self.refresh)
+        controls.addWidget(self.depth_input)
+        refresh_button = QPushButton('Refresh')
+        refresh_button.clicked.connect(self.refresh)
+        controls.addWidget(refresh_button)
+        layout.addLayout(controls)
+
+        self.figure = Figure(figsize=(6, 4))
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        self.canvas.mpl_connect('button_press_event', self.canvas_clicked)
+        layout.addWidget(NavigationToolbar2QT(self.canvas, self))
+        layout.addWidget(self.canvas)
+        self.status = QLabel()
+        layout.addWidget(self.status)
+        self.setLayout(layout)
+
+    def update_relationship_types(self):
+        current = self.relationship_type.currentText()
+        self.relationship_type.clear()
+        self.relationship_type.addItems(list(self.parent.group.relationships))
+        if current in self.parent.group.relationships:
+            self.relationship_type.setCurrentText(current)
+
+    def graph_edges(self, group, relationship):
+        """Return (names, sources, targets) for the whole graph, or for the selected person's neighbourhood."""
+        names, sources, targets = group.edge_arrays(relationship)
+        person = self.parent.selected_person()
+        if not self.neighborhood_checkbox.isChecked() or person not in group.people:
+            return names, sources, targets
+
+        # Grow the neighbourhood one step at a time, following edges in both directions
+        inside = np.zeros(len(names), dtype=bool)
+        inside[names.index(person)] = True
+        for _ in range(self.depth_input.value()):
+            reached = inside[sources] | inside[targets]
+            inside[sources[reached]] = True
+            inside[targets[reached]] = True
+        rows = np.flatnonzero(inside)
+        renumber = np.full(len(names), -1)
+        renumber[rows] = np.arange(len(rows))
+        kept = inside[sources] & inside[targets]
+        return [names[row] for row in rows], renumber[sources[kept]], renumber[targets[kept]]
+
+    def cancel(self):
+        if self.layout_task:
+            self.layout_task.cancelled = True
+            self.layout_task = None
+
+    def refresh(self):
+        if self.parent.tab_widget.currentWidget() is not self:
+            return
+        self.cancel()
+        self.update_relationship_types()
+        group = self.parent.group
+        relationship = self.relationship_type.currentText()
+        if not relationship:
+            self.figure.clear()
+            self.canvas.draw_idle()
+            self.status.setText('No relationships to show.')
+            return
+
+        names, sources, targets = self.graph_edges(group, relationship)
+        whole = len(names) == len(group.people)
+        if whole and group.layout_is_current(relationship):
+            self.draw(names, sources, targets, relationship, group.layouts[relationship])
+            return
+
+        # Earlier positions are reused, so only new people need placing and the picture stays put
+        previous = dict(group.layouts.get(relationship, {}))
+        self.layout_task = LayoutTask(names, sources, targets, previous, self.layout_signals)
+        # Where the finished layout goes, kept here since the task never sees the group
+        self.layout_target = (group, relationship, group.version, whole)
+        self.status.setText(f'Laying out {len(names)} people...')
+        self.layout_pool.start(self.layout_task)
+
+    def layout_progress(self, task, positions):
+        self.layout_ready(task, positions, False)
+
+    def layout_finished(self, task, positions):
+        self.layout_ready(task, positions, True)
+
+    def layout_ready(self, task, positions, finished):
+        # Signals from a cancelled or replaced task are still delivered, and ignored here
+        if task is not self.layout_task:
+            return
+        group, relationship, version, whole = self.layout_target
+        if isinstance(positions, Exception):
+            self.layout_task = None
+            self.status.setText(f'Layout failed: {positions}')
+            return
+        layout = dict(zip(task.names, map(tuple, positions.tolist())))
+        if finished:
+            self.layout_task = None
+            if whole:
+                group.set_relationship_layout(relationship, layout, version)
+            elif relationship in group.layouts:
+                group.layouts[relationship].update(layout)
+        self.draw(task.names, task.sources, task.targets, relationship, layout)
+        if not finished:
+            self.status.setText(f'Laying out {len(task.names)} people...')
+
+    def draw(self, names, sources, targets, relationship, layout):
+        self.figure.clear()
+        positions = np.array([layout[name] for name in names], dtype=float).reshape(len(names), 2)
+        self.drawn = render.draw_graph(self.figure.add_subplot(), names, positions, sources, targets, f"{relationship.capitalize()} Relationship Graph")
+        self.canvas.draw_idle()
+        self.status.setText(f'{len(names)} people, {len(sources)} relationships')
+
+    def canvas_clicked(self, event):
+        """Show the details of the person drawn nearest to a click, if any is close enough."""
+        if self.drawn is None or event.inaxes is None or not len(self.drawn[0]):
+            return
+        points, members = self.drawn
+        on_screen = event.inaxes.transData.transform(points)
+        distance = np.hypot(on_screen[:, 0] - event.x, on_screen[:, 1] - event.y)
+        nearest = int(np.argmin(distance))
+        if distance[nearest] <= GRAPH_CLICK_RADIUS and members[nearest]:
+            self.parent.select_person(members[nearest][0])
+
+
 class PersonCreationTab(QWidget):
     def __init__(self, parent):
         super().__init__()
@@ -347,12 +810,20 @@ class PersonCreationTab(QWidget):
                         if not hasattr(person, 'custom_attributes'):
                             person.custom_attributes = {}
                         person.custom_attributes[attr_name] = attr_value
+
+            # Record the lists and dicts filled in place above in the group's journal
+            for attr in ['emails', 'links', 'custom_attributes']:
+                if getattr(person, attr, None):
+                    person.attribute_changed(attr)
             
+            added = [person.fullname]
             for target_name, relationship, directed in self.relationships:
                 if directed:
                     person.add_directed_relationship(target_name, relationship)
                 else:
                     person.add_undirected_relationship(target_name, relationship)
+                # The target is in the group by now, so this only looks up their full name
+                added.append(Person(target_name, self.parent.group).fullname)
 
             self.name_input.clear()
             self.bio_input.clear()
@@ -363,8 +834,8 @@ class PersonCreationTab(QWidget):
             self.link_title.setVisible(False)
             self.custom_attribute_title.setVisible(False)
             self.relationships.clear()
-            self.parent.update_person_list()
-            self.parent.person_list.setCurrentRow(self.parent.person_list.count() - 1)
+            self.parent.update_person_list(added)
+            self.parent.select_person(person.fullname)
 
     def clear_emails(self):
         while self.email_layout.count():
@@ -384,7 +855,7 @@ class PersonCreationTab(QWidget):
     def update_suggestions(self, text):
         self.suggestion_list.clear()
         if text:
-            suggestions = [person for person in self.parent.group.people if text.lower() in person.lower()]
+            suggestions = self.parent.group.search_names(text, limit=SUGGESTION_LIMIT)
             self.suggestion_list.addItems(suggestions)
             self.suggestion_list.setVisible(True)
         else:
@@ -687,6 +1158,7 @@ class PersonEditTab(QWidget):
         email = email_input.text()
         if email:
             self.person.emails.append(email)
+            self.person.attribute_changed('emails')
             self.update_email_layout()
 
     def edit_email(self, email, email_widget):
@@ -707,10 +1179,12 @@ class PersonEditTab(QWidget):
         if new_email:
             self.person.emails.remove(old_email)
             self.person.emails.append(new_email)
+            self.person.attribute_changed('emails')
             self.update_email_layout()
 
     def delete_email(self, email):
         self.person.emails.remove(email)
+        self.person.attribute_changed('emails')
         self.update_email_layout()
 
     def add_link(self):
@@ -727,6 +1201,7 @@ class PersonEditTab(QWidget):
         link = link_input.text()
         if link:
             self.person.links.append(link)
+            self.person.attribute_changed('links')
             self.update_link_layout()
 
     def edit_link(self, link, link_widget):
@@ -747,10 +1222,12 @@ class PersonEditTab(QWidget):
         if new_link:
             self.person.links.remove(old_link)
             self.person.links.append(new_link)
+            self.person.attribute_changed('links')
             self.update_link_layout()
 
     def delete_link(self, link):
         self.person.links.remove(link)
+        self.person.attribute_changed('links')
         self.update_link_layout()
 
     def add_custom_attribute(self):
@@ -774,6 +1251,7 @@ class PersonEditTab(QWidget):
             if not hasattr(self.person, 'custom_attributes'):
                 self.person.custom_attributes = {}
             self.person.custom_attributes[attr_name] = attr_value
+            self.person.attribute_changed('custom_attributes')
             self.update_custom_attribute_layout()
 
     def edit_custom_attribute(self, attr_name, attr_value, custom_attribute_widget):
@@ -801,10 +1279,12 @@ class PersonEditTab(QWidget):
         if new_attr_name and new_attr_value:
             del self.person.custom_attributes[old_attr_name]
             self.person.custom_attributes[new_attr_name] = new_attr_value
+            self.person.attribute_changed('custom_attributes')
             self.update_custom_attribute_layout()
 
     def delete_custom_attribute(self, attr_name):
         del self.person.custom_attributes[attr_name]
+        self.person.attribute_changed('custom_attributes')
         self.update_custom_attribute_layout()
 
     def edit_attribute(self, attr_name, attribute_widget):
@@ -842,23 +1322,19 @@ class PersonEditTab(QWidget):
             self.relationship_layout.removeWidget(relationship_widget)
             relationship_widget.deleteLater()
 
-        for relationship in self.person.group.relationships:
-            if relationship in self.person.get_relationships():
-                people = self.person.get_relationships()[relationship]
-                for person_name in people:
-                    relationship_widget = QWidget()
-                    relationship_layout = QHBoxLayout(relationship_widget)
-                    relationship_label = QLabel(f"{person_name} ({relationship})")
-                    delete_button = QPushButton('Delete')
-                    delete_button.clicked.connect(lambda checked, r=relationship, p=person_name: self.delete_relationship(r, p))
-                    relationship_layout.addWidget(relationship_label)
-                    relationship_layout.addWidget(delete_button)
-                    self.relationship_layout.addWidget(relationship_widget)
+        for relationship in self.person.relationship_types():
+            for person_name in self.person.neighbors(relationship):
+                relationship_widget = QWidget()
+                relationship_layout = QHBoxLayout(relationship_widget)
+                relationship_label = QLabel(f"{person_name} ({relationship})")
+                delete_button = QPushButton('Delete')
+                delete_button.clicked.connect(lambda checked, r=relationship, p=person_name: self.delete_relationship(r, p))
+                relationship_layout.addWidget(relationship_label)
+                relationship_layout.addWidget(delete_button)
+                self.relationship_layout.addWidget(relationship_widget)
 
     def filter_person_list(self, text):
-        for row in range(self.parent.person_list.count()):
-            item = self.parent.person_list.item(row)
-            item.setHidden(text.lower() not in item.text().lower())
+        self.parent.filter_person_list(text)
 
     def handle_relationship_type(self, text):
         if text == 'Custom':
@@ -871,7 +1347,7 @@ class PersonEditTab(QWidget):
     def update_suggestions(self, text):
         self.suggestion_list.clear()
         if text:
-            suggestions = [person for person in self.person.group.people if text.lower() in person.lower()]
+            suggestions = self.person.group.search_names(text, limit=SUGGESTION_LIMIT)
             self.suggestion_list.addItems(suggestions)
             self.suggestion_list.setVisible(True)
         else:
@@ -899,16 +1375,15 @@ class PersonEditTab(QWidget):
                 self.person.add_directed_relationship(target_name, relationship)
             else:
                 self.person.add_undirected_relationship(target_name, relationship)
-            self.parent.update_person_list()
+            # The target is in the group by now, so this only looks up their full name
+            self.parent.update_person_list([Person(target_name, self.person.group).fullname])
             self.relationship_input.clear()
             self.custom_relationship_input.clear()
             self.suggestion_list.setVisible(False)
-            self.parent.group.update_relationship_graphs()
             self.update_relationship_list()
 
     def delete_relationship(self, relationship, person_name):
         self.person.remove_relationship(person_name, relationship)
-        self.parent.group.update_relationship_graphs()
         self.update_relationship_list()
     
     def delete_person(self):
@@ -917,8 +1392,8 @@ class PersonEditTab(QWidget):
 
         if reply == QMessageBox.Yes:
             self.parent.group.remove_person(self.person.fullname)
-            self.parent.update_person_list()
-            self.parent.person_list.setCurrentRow(-1)
+            self.parent.update_person_list(removed=[self.person.fullname])
+            self.parent.select_person(None)
             self.clear_person_details()
 
     def clear_person_details(self):
@@ -965,7 +1440,7 @@ def main():
     last_loaded_file = None
 
     if last_saved_file:
-        group = Group(last_saved_file)
+        group = Group(last_saved_file, journaled=True, lazy=True)
         last_loaded_file = last_saved_file
     else:
         group = Group()
@@ -0,0 +1,239 @@
+"""Vectorized graph analytics over the compressed sparse row export of a Group.
+
+Every function takes a group and the relationship types to analyse (all of them by default for the
+centrality measures, 'friends' for recommendations), works on the NumPy arrays returned by
+Group.to_csr, and returns its results keyed by fullname. Relationships only count between people
+in the group, matching the graphs in Group.graphs.
+"""
+import weakref
+
+import numpy as np
+import networkx as nx
+
+# Upper bound on the number of two-step paths held in memory at once while counting triangles
+WEDGE_BATCH = 2 ** 22
+
+# Undirected graphs used for recommendations, kept per group and relationship until the group next changes
+_friend_graphs = weakref.WeakKeyDictionary()
+
+
+def _ranges(indptr, rows):
+    """Return the concatenated positions indptr[row]:indptr[row + 1] for each row, and their lengths."""
+    lengths = indptr[rows + 1] - indptr[rows]
+    ends = np.cumsum(lengths)
+    positions = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths - indptr[rows], lengths)
+    return positions, lengths
+
+
+def _symmetric(indptr, indices):
+    """Merge a CSR graph with its reverse and drop self-loops, giving the arcs of the undirected graph."""
+    size = len(indptr) - 1
+    sources = np.repeat(np.arange(size), np.diff(indptr))
+    keep = sources != indices
+    sources, targets = sources[keep], indices[keep]
+    arcs = np.unique(np.concatenate([sources * size + targets, targets * size + sources]))
+    symmetric = np.zeros(size + 1, dtype=np.int64)
+    if size:
+        np.cumsum(np.bincount(arcs // size, minlength=size), out=symmetric[1:])
+        arcs %= size
+    return symmetric, arcs
+
+
+def degrees(group, relationships=None, direction='out'):
+    """Return the degree of each person: their 'out' arcs, 'in' arcs, or the 'total' of both.
+
+    For undirected relationships every edge is an arc in both directions, so all three agree
+    except 'total', which counts each edge twice like networkx does for a directed graph. Unlike
+    networkx, a person related to themselves counts that relationship once, not twice.
+    """
+    assert direction in ('out', 'in', 'total'), f'Unknown degree direction "{direction}".'
+    indptr, indices, names = group.to_csr(relationships)
+    counts = np.zeros(len(names), dtype=np.int64)
+    if direction in ('out', 'total'):
+        counts += np.diff(indptr)
+    if direction in ('in', 'total'):
+        counts += np.bincount(indices, minlength=len(names))
+    return dict(zip(names, counts.tolist()))
+
+
+def degree_histogram(group, relationships=None, direction='out'):
+    """Return a list whose i-th entry is the number of people with degree i."""
+    counts = np.fromiter(degrees(group, relationships, direction).values(), dtype=np.int64)
+    return np.bincount(counts).tolist() if len(counts) else []
+
+
+def pagerank(group, relationships=None, alpha=0.85, max_iter=100, tol=1.0e-6):
+    """Return the PageRank of each person, computed by power iteration.
+
+    Follows networkx.pagerank: the rank of people with no outgoing arcs is spread evenly over
+    everyone, and iteration stops once the total change falls below len(group.people) * tol.
+    """
+    indptr, indices, names = group.to_csr(relationships)
+    size = len(names)
+    if size == 0:
+        return dict()
+    out_degree = np.diff(indptr)
+    sources = np.repeat(np.arange(size), out_degree)
+    dangling = out_degree == 0
+    inverse_degree = np.divide(1.0, out_degree, out=np.zeros(size), where=~dangling)
+
+    rank = np.full(size, 1.0 / size)
+    for _ in range(max_iter):
+        previous = rank
+        spread = np.bincount(indices, weights=(previous * inverse_degree)[sources], minlength=size)
+        rank = alpha * (spread + previous[dangling].sum() / size) + (1 - alpha) / size
+        if np.abs(rank - previous).sum() < size * tol:
+            return dict(zip(names, rank.tolist()))
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def triangles(group, relationships=None):
+    """Return the number of triangles each person is part of, treating every arc as undirected."""
+    indptr, indices, names = group.to_csr(relationships)
+    indptr, indices = _symmetric(indptr, indices)
+    return dict(zip(names, _count_triangles(indptr, indices).tolist()))
+
+
+def _count_triangles(indptr, indices):
+    """Count triangles per node of a symmetric CSR graph whose rows are sorted.
+
+    Every two-step path u -> v -> w is checked for a closing arc u -> w with a binary search over
+    the sorted arc keys; each triangle at u is found twice, once through each of its other corners.
+    Paths are generated in batches of about WEDGE_BATCH so memory stays bounded on dense graphs.
+    """
+    size = len(indptr) - 1
+    sources = np.repeat(np.arange(size), np.diff(indptr))
+    keys = sources * size + indices
+    wedges = np.cumsum(np.diff(indptr)[indices])
+    closed = np.zeros(size, dtype=np.int64)
+    start = 0
+    while start < len(indices):
+        done = wedges[start - 1] if start else 0
+        stop = max(int(np.searchsorted(wedges, done + WEDGE_BATCH, side='right')), start + 1)
+        positions, lengths = _ranges(indptr, indices[start:stop])
+        first = np.repeat(sources[start:stop], lengths)
+        last = indices[positions]
+        query = first * size + last
+        found = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        hits = keys[found] == query
+        closed += np.bincount(first[hits], minlength=size)
+        start = stop
+    return closed // 2
+
+
+def clustering(group, relationships=None):
+    """Return the local clustering coefficient of each person, treating every arc as undirected.
+
+    This matches networkx.clustering on the undirected graph of the given relationship types.
+    """
+    indptr, indices, names = group.to_csr(relationships)
+    indptr, indices = _symmetric(indptr, indices)
+    degree = np.diff(indptr)
+    pairs = degree * (degree - 1)
+    coefficients = np.divide(2.0 * _count_triangles(indptr, indices), pairs, out=np.zeros(len(names)), where=pairs > 0)
+    return dict(zip(names, coefficients.tolist()))
+
+
+def _friend_graph(group, relationship):
+    """Return (indptr, indices, names, rows, degree, keys) for the undirected graph of one relationship.
+
+    rows maps each fullname to its row, and keys holds every arc as source * len(names) + target in
+    ascending order. The arrays are built once per version of the group, so recommending friends
+    for one person after another only pays for the export when something has changed.
+    """
+    graphs = _friend_graphs.setdefault(group, dict())
+    if relationship not in graphs or graphs[relationship][0] != group.version:
+        indptr, indices, names = group.to_csr([relationship])
+        indptr, indices = _symmetric(indptr, indices)
+        degree = np.diff(indptr)
+        keys = np.repeat(np.arange(len(names)), degree) * len(names) + indices
+        rows = {name: row for row, name in enumerate(names)}
+        graphs[relationship] = (group.version, indptr, indices, names, rows, degree, keys)
+    return graphs[relationship][1:]
+
+
+def _score_candidates(indptr, indices, degree, keys, rows, method):
+    """Score every friend-of-friend of the given rows of a symmetric CSR graph.
+
+    Returns parallel arrays (row position, candidate, score), one entry per distinct candidate,
+    excluding each person themselves and the people they are already related to.
+    """
+    size = len(indptr) - 1
+    middle_positions, lengths = _ranges(indptr, rows)
+    middle = indices[middle_positions]
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    candidate_positions, lengths = _ranges(indptr, middle)
+    candidates = indices[candidate_positions]
+    owner = np.repeat(owner, lengths)
+    if method == 'adamic_adar':
+        # A mutual friend always has at least two friends, so the logarithm is never zero where it is used
+        logs = np.log(degree[middle])
+        weights = np.repeat(np.divide(1.0, logs, out=np.zeros(len(middle)), where=logs > 0), lengths)
+    else:
+        weights = np.ones(len(candidates))
+
+    # Drop the person themselves and anyone already related to them
+    query = rows[owner] * size + candidates
+    found = np.minimum(np.searchsorted(keys, query), max(len(keys) - 1, 0))
+    keep = candidates != rows[owner]
+    if len(keys):
+        keep &= keys[found] != query
+    pairs, inverse = np.unique(owner[keep] * size + candidates[keep], return_inverse=True)
+    scores = np.bincount(inverse, weights=weights[keep], minlength=len(pairs))
+    return pairs // size, pairs % size, scores
+
+
+def _top_k(owners, candidates, scores, count, k):
+    """Return the k best (candidate, score) pairs for each of 'count' owners, highest score first."""
+    order = np.lexsort((candidates, -scores, owners))
+    owners, candidates, scores = owners[order], candidates[order], scores[order]
+    starts = np.searchsorted(owners, np.arange(count))
+    rank = np.arange(len(owners)) - starts[owners]
+    best = rank < k
+    owners, candidates, scores = owners[best], candidates[best], scores[best]
+    bounds = np.searchsorted(owners, np.arange(count + 1))
+    return [
+        (candidates[bounds[i]:bounds[i + 1]].tolist(), scores[bounds[i]:bounds[i + 1]].tolist())
+        for i in range(count)
+    ]
+
+
+def recommend_friends_batch(group, fullnames=None, k=10, method='mutual', relationship='friends', batch_wedges=WEDGE_BATCH):
+    """Yield (fullname, recommendations) for each person, scoring friends-of-friends in bounded batches.
+
+    Recommendations are the k best (fullname, score) pairs for people the person is not yet related
+    to, ranked by their number of mutual friends, or by their Adamic-Adar score if method is
+    'adamic_adar', where a mutual friend with d friends contributes 1 / log(d). Ties go to whoever
+    comes first in the group. People are scored together until about 'batch_wedges' friend-of-friend
+    paths are in memory, so the whole group can be scored without building every pair at once.
+    """
+    assert method in ('mutual', 'adamic_adar'), f'Unknown recommendation method "{method}".'
+    indptr, indices, names, position, degree, keys = _friend_graph(group, relationship)
+    if fullnames is None:
+        rows = np.arange(len(names))
+    else:
+        for fullname in fullnames:
+            assert fullname in position, f'Person "{fullname}" is not in the group.'
+        rows = np.array([position[fullname] for fullname in fullnames], dtype=np.int64)
+
+    # Number of friend-of-friend paths leaving each requested person, used to size the batches
+    positions, lengths = _ranges(indptr, rows)
+    owners = np.repeat(np.arange(len(rows)), lengths)
+    wedges = np.cumsum(np.bincount(owners, weights=degree[indices[positions]], minlength=len(rows)))
+    start = 0
+    while start < len(rows):
+        done = wedges[start - 1] if start else 0
+        stop = max(int(np.searchsorted(wedges, done + batch_wedges, side='right')), start + 1)
+        batch = rows[start:stop]
+        owners, candidates, scores = _score_candidates(indptr, indices, degree, keys, batch, method)
+        if method == 'mutual':
+            scores = scores.astype(np.int64)
+        for row, (best, best_scores) in zip(batch.tolist(), _top_k(owners, candidates, scores, len(batch), k)):
+            yield names[row], [(names[candidate], score) for candidate, score in zip(best, best_scores)]
+        start = stop
+
+
+def recommend_friends(group, fullname, k=10, method='mutual', relationship='friends'):
+    """Return the k best (fullname, score) friend recommendations for one person."""
+    for _, recommendations in recommend_friends_batch(group, [fullname], k, method, relationship):
+        return recommendations
@@ -1,122 +1,1452 @@
+import io
+import os
 import re
 import json
+import time
+import pstats
+import cProfile
+import contextlib
+import tracemalloc
+import functools
+import uuid
+import weakref
+import heapq
+import bisect
+import itertools
+import collections.abc
+import threading
+import concurrent.futures
+import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
+import snapshot
+import journal
+import database
+import graph_layout
+import render
 
 
-def parse_name(name):
-    """Takes a name string in any format and returns the first name, last name, and middle initial."""
-    # Remove leading/trailing whitespace
-    name = name.strip()
-
-    # Define regular expression patterns for different name formats
-    patterns = [
-        r'^(?P<first>\w+)\s+(?P<middle>\w\.)\s+(?P<last>\w+)$',  # Firstname M. Lastname
-        r'^(?P<first>\w+)\s+(?P<last>\w+)$',                     # Firstname Lastname
-        r'^(?P<last>\w+),\s+(?P<first>\w+)$',                    # Lastname, Firstname
-        r'^(?P<last>\w+),\s+(?P<first>\w+)\s+(?P<middle>\w\.)$'  # Lastname, Firstname M.
-    ]
+# Every supported name format, combined into one precompiled pattern:
+#   Firstname Lastname, Firstname M. Lastname, Lastname, Firstname and Lastname, Firstname M.
+NAME_PATTERN = re.compile(
+    r'^(?:(?P<first>\w+)\s+(?:(?P<middle>\w\.)\s+)?(?P<last>\w+)'
+    r'|(?P<last_first>\w+),\s+(?P<first_last>\w+)(?:\s+(?P<middle_last>\w\.))?)$'
+)
 
-    # Iterate over the patterns and try to match the name
-    for pattern in patterns:
-        match = re.match(pattern, name)
-        if match:
-            # Extract the matched groups
-            first = match.group('first')
-            last = match.group('last')
-            middle = match.group('middle') if 'middle' in match.groupdict() else ''
 
-            # Capitalize the first letter and lowercase the rest
-            first = first.capitalize()
-            last = last.capitalize()
-            middle = middle.capitalize() if middle else None
+@functools.lru_cache(maxsize=2 ** 16)
+def parse_name(name):
+    """Takes a name string in any format and returns the first name, last name, and middle initial.
 
-            return first, last, middle
+    Results are memoized in a bounded LRU cache; parse_name.cache_info() reports its hits and misses.
+    """
+    # Remove leading/trailing whitespace and try every format at once
+    match = NAME_PATTERN.match(name.strip())
 
     # If no match is found, return None for all fields
-    return None, None, None
+    if not match:
+        return None, None, None
+
+    # Extract the matched groups, whichever format they came from
+    first = match.group('first') or match.group('first_last')
+    last = match.group('last') or match.group('last_first')
+    middle = match.group('middle') or match.group('middle_last')
+
+    # Capitalize the first letter and lowercase the rest
+    return first.capitalize(), last.capitalize(), middle.capitalize() if middle else None
+
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+
+def is_ndjson_file(filename):
+    """Group files ending in .ndjson or .jsonl use the line-delimited format."""
+    return filename.lower().endswith(NDJSON_EXTENSIONS)
+
+
+# Attributes that can be left on disk by a lazy load until a person is first accessed
+LAZY_ATTRIBUTES = ('bio', 'custom_attributes', 'emails', 'links')
+
+# The saved record of a person: the core PERSON_FIELDS, a list of names per relationship type they
+# have, and any extra attributes set on them. UNSAVED_ATTRIBUTES belong to the object, not the person.
+PERSON_FIELDS = ('firstname', 'middle', 'lastname', 'fullname', 'emails', 'links')
+UNSAVED_ATTRIBUTES = frozenset(('group', '_pending'))
+
+
+class NDJSONSource:
+    """Reads back the LAZY_ATTRIBUTES of people lazily loaded from a line-delimited group file.
+
+    The file is held open, so the original records stay readable even after a save replaces it.
+    """
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        self.lock = threading.Lock()
+
+    def attributes(self, offset):
+        with self.lock:
+            self.file.seek(offset)
+            line = self.file.readline()
+        attrs = json.loads(line)
+        return {attr: attrs[attr] for attr in LAZY_ATTRIBUTES if attr in attrs}
+
+
+def parse_names(names):
+    """Parse many names for a bulk load, parsing each distinct name once; returns a list of parse_name results."""
+    parsed = dict()
+    results = []
+    for name in names:
+        if name not in parsed:
+            parsed[name] = parse_name(name)
+        results.append(parsed[name])
+    return results
+
+
+class RelationshipStore:
+    """Central adjacency store for the relationships of a Group.
+
+    Every name is interned to an integer ID, and each relationship type maps a source ID to an
+    insertion-ordered dict of target IDs, so adding, removing and checking an edge are all O(1).
+    Edges are stored as arcs: an undirected relationship is held as one arc in each direction.
+    A reverse index of incoming arcs is built per relationship type the first time it is needed.
+    """
+    def __init__(self):
+        self.ids = dict()
+        self.names = []
+        self.adjacency = dict()
+        self.incoming = dict()
+
+    def intern(self, name):
+        """Return the integer ID for a name, assigning a new one if the name has not been seen."""
+        person_id = self.ids.get(name)
+        if person_id is None:
+            person_id = len(self.names)
+            self.ids[name] = person_id
+            self.names.append(name)
+        return person_id
+
+    def _targets(self, name, relationship):
+        """Return the target dict of 'name' for a relationship, or None if it has no edges."""
+        person_id = self.ids.get(name)
+        if person_id is None:
+            return None
+        return self.adjacency.get(relationship, {}).get(person_id)
+
+    def _incoming(self, relationship):
+        """Return the reverse index of a relationship, mapping each target ID to a dict of source IDs."""
+        incoming = self.incoming.get(relationship)
+        if incoming is None:
+            incoming = self.incoming[relationship] = dict()
+            for source_id, targets in self.adjacency.get(relationship, {}).items():
+                for target_id in targets:
+                    incoming.setdefault(target_id, {})[source_id] = None
+        return incoming
+
+    def add_edge(self, source, target, relationship):
+        """Add an arc from source to target; returns False if it was already present."""
+        source_id = self.intern(source)
+        targets = self.adjacency.setdefault(relationship, {}).setdefault(source_id, {})
+        target_id = self.intern(target)
+        if target_id in targets:
+            return False
+        targets[target_id] = None
+        if relationship in self.incoming:
+            self.incoming[relationship].setdefault(target_id, {})[source_id] = None
+        return True
+
+    def remove_edge(self, source, target, relationship):
+        """Remove the arc from source to target; returns False if it was not present."""
+        targets = self._targets(source, relationship)
+        target_id = self.ids.get(target)
+        if targets is None or target_id not in targets:
+            return False
+        source_id = self.ids[source]
+        del targets[target_id]
+        if not targets:
+            del self.adjacency[relationship][source_id]
+        if relationship in self.incoming:
+            sources = self.incoming[relationship][target_id]
+            del sources[source_id]
+            if not sources:
+                del self.incoming[relationship][target_id]
+        return True
+
+    def has_edge(self, source, target, relationship):
+        targets = self._targets(source, relationship)
+        return targets is not None and self.ids.get(target) in targets
+
+    def neighbors(self, name, relationship):
+        """Return the names 'name' points to for a relationship, in insertion order."""
+        targets = self._targets(name, relationship)
+        if not targets:
+            return []
+        return [self.names[target_id] for target_id in targets]
+
+    def degree(self, name, relationship):
+        targets = self._targets(name, relationship)
+        return len(targets) if targets else 0
+
+    def predecessors(self, name, relationship):
+        """Return the names that point to 'name' for a relationship."""
+        person_id = self.ids.get(name)
+        if person_id is None:
+            return []
+        return [self.names[source_id] for source_id in self._incoming(relationship).get(person_id, ())]
+
+
+class LazyAdjacency(dict):
+    """Adjacency rows of one relationship type, read from CSR arrays the first time each row is touched.
+
+    Behaves like the plain dict of rows a RelationshipStore keeps, so a group opened from a snapshot
+    only pays for the rows it actually uses.
+    """
+    def __init__(self, indptr, indices):
+        super().__init__()
+        self.indptr = indptr
+        self.indices = indices
+        self.loaded = bytearray(len(indptr) - 1)
+        self.complete = not self.loaded
+
+    def _load(self, row):
+        if isinstance(row, int) and 0 <= row < len(self.loaded) and not self.loaded[row]:
+            self.loaded[row] = 1
+            start, end = self.indptr[row], self.indptr[row + 1]
+            if start != end:
+                dict.__setitem__(self, row, dict.fromkeys(self.indices[start:end]))
+
+    def _load_all(self):
+        if not self.complete:
+            for row in range(len(self.loaded)):
+                self._load(row)
+            self.complete = True
+
+    def get(self, row, default=None):
+        self._load(row)
+        return super().get(row, default)
+
+    def setdefault(self, row, default=None):
+        self._load(row)
+        return super().setdefault(row, default)
+
+    def pop(self, row, *default):
+        self._load(row)
+        return super().pop(row, *default)
+
+    def __getitem__(self, row):
+        self._load(row)
+        return super().__getitem__(row)
+
+    def __setitem__(self, row, targets):
+        self._load(row)
+        super().__setitem__(row, targets)
+
+    def __delitem__(self, row):
+        self._load(row)
+        super().__delitem__(row)
+
+    def __contains__(self, row):
+        self._load(row)
+        return super().__contains__(row)
+
+    def __iter__(self):
+        self._load_all()
+        return super().__iter__()
+
+    def __len__(self):
+        self._load_all()
+        return super().__len__()
+
+    def keys(self):
+        self._load_all()
+        return super().keys()
+
+    def values(self):
+        self._load_all()
+        return super().values()
+
+    def items(self):
+        self._load_all()
+        return super().items()
+
+
+class DatabaseNames:
+    """The names of a Database by ID, shaped like the list a RelationshipStore keeps and cached as they are read."""
+    def __init__(self, source):
+        self.source = source
+        self.cache = dict()
+
+    def __getitem__(self, name_id):
+        name = self.cache.get(name_id)
+        if name is None:
+            name = self.source.name(name_id)
+            if name is None:
+                raise IndexError(name_id)
+            self.cache[name_id] = name
+        return name
+
+    def __len__(self):
+        return self.source.name_count
+
+
+class DatabaseIds:
+    """The IDs of the names in a Database, shaped like the dict a RelationshipStore keeps and cached as they are read."""
+    def __init__(self, source):
+        self.source = source
+        self.cache = dict()
+
+    def get(self, name, default=None):
+        name_id = self.cache.get(name)
+        if name_id is None:
+            name_id = self.source.name_id(name)
+            if name_id is None:
+                return default
+            self.cache[name] = name_id
+        return name_id
+
+    def __getitem__(self, name):
+        name_id = self.get(name)
+        if name_id is None:
+            raise KeyError(name)
+        return name_id
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+
+class DatabaseAdjacency:
+    """Adjacency rows of one relationship type in a Database, shaped like the dict of rows a RelationshipStore keeps.
+
+    Nothing is cached: each row is read from the database when asked for, so the view never goes
+    stale. With reverse=True, the rows hold the sources of the arcs into each ID instead.
+    """
+    def __init__(self, source, relationship, reverse=False):
+        self.source = source
+        self.relationship = relationship
+        self.reverse = reverse
+
+    def get(self, name_id, default=None):
+        targets = self.source.targets(self.relationship, name_id, self.reverse)
+        return dict.fromkeys(targets) if targets else default
+
+    def __contains__(self, name_id):
+        return self.get(name_id) is not None
+
+    def items(self):
+        return ((name_id, dict.fromkeys(targets)) for name_id, targets in self.source.rows(self.relationship, self.reverse))
+
+    def keys(self):
+        return (name_id for name_id, _ in self.items())
+
+    def values(self):
+        return (targets for _, targets in self.items())
+
+    __iter__ = keys
+
+
+class DatabaseStore(RelationshipStore):
+    """RelationshipStore over the names and edges tables of a Database.
+
+    Every check, lookup and edit runs against the rows involved, so the arcs never have to fit in
+    memory. The ids, names and adjacency attributes answer the same lookups as the dicts of the
+    in-memory store, for code that walks the store by ID.
+    """
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+        self.ids = DatabaseIds(source)
+        self.names = DatabaseNames(source)
+        self.adjacency = {relationship: DatabaseAdjacency(source, relationship) for relationship in source.relationships()}
+
+    def intern(self, name):
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.source.add_name(name)
+            self.ids.cache[name] = name_id
+            self.names.cache[name_id] = name
+        return name_id
+
+    def _targets(self, name, relationship):
+        name_id = self.ids.get(name)
+        if name_id is None:
+            return None
+        return self.adjacency.get(relationship, {}).get(name_id)
+
+    def _incoming(self, relationship):
+        return DatabaseAdjacency(self.source, relationship, reverse=True)
+
+    def add_edge(self, source, target, relationship):
+        if relationship not in self.adjacency:
+            self.adjacency[relationship] = DatabaseAdjacency(self.source, relationship)
+        return self.source.add_edge(relationship, self.intern(source), self.intern(target))
+
+    def remove_edge(self, source, target, relationship):
+        source_id, target_id = self.ids.get(source), self.ids.get(target)
+        if source_id is None or target_id is None:
+            return False
+        return self.source.remove_edge(relationship, source_id, target_id)
+
+    def has_edge(self, source, target, relationship):
+        source_id, target_id = self.ids.get(source), self.ids.get(target)
+        return source_id is not None and target_id is not None and self.source.has_edge(relationship, source_id, target_id)
+
+    def neighbors(self, name, relationship):
+        name_id = self.ids.get(name)
+        if name_id is None:
+            return []
+        return [self.names[target_id] for target_id in self.source.targets(relationship, name_id)]
+
+    def degree(self, name, relationship):
+        name_id = self.ids.get(name)
+        return self.source.degree(relationship, name_id) if name_id is not None else 0
+
+    def predecessors(self, name, relationship):
+        name_id = self.ids.get(name)
+        if name_id is None:
+            return []
+        return [self.names[source_id] for source_id in self.source.targets(relationship, name_id, reverse=True)]
+
+
+class DatabaseRelationships(dict):
+    """The relationship types of a Group kept in a Database, writing each new or changed type through to it."""
+    def __init__(self, source):
+        super().__init__(source.relationships())
+        self.source = source
+
+    def __setitem__(self, relationship, kind):
+        if self.get(relationship) != kind:
+            self.source.set_relationship(relationship, kind)
+        super().__setitem__(relationship, kind)
+
+    def setdefault(self, relationship, kind=None):
+        if relationship not in self:
+            self[relationship] = kind
+        return self[relationship]
+
+
+class DatabasePeople(collections.abc.MutableMapping):
+    """The people of a Group kept in a Database, read one row at a time.
+
+    A Person is created the first time they are looked up, with their attributes left in the
+    database until first accessed, and is kept only while something else still refers to them.
+    People whose attributes have been read or added are held until the next commit, along with
+    the attributes as stored, since a list or dict may be edited in place without being set
+    again; commit writes back whatever changed. Adding or removing a person inserts or deletes
+    their rows.
+    """
+    def __init__(self, group, source):
+        self.group = group
+        self.source = source
+        self.loaded = weakref.WeakValueDictionary()
+        self.held = dict()
+
+    def __getitem__(self, fullname):
+        if fullname not in self.loaded and not self.source.has_person(fullname):
+            raise KeyError(fullname)
+        return self._person(fullname)
+
+    def _person(self, fullname):
+        person = self.loaded.get(fullname)
+        if person is None:
+            person = self.loaded[fullname] = Person._from_source(fullname, self.group, self, fullname)
+        return person
+
+    def attributes(self, fullname):
+        """Read a person's attributes back from the database, holding the person until the next commit."""
+        attributes = self.source.attributes(fullname)
+        person = self.loaded.get(fullname)
+        if person is not None:
+            self.held[fullname] = (person, json.dumps(attributes, sort_keys=True))
+        return attributes
+
+    def commit(self):
+        """Write back the attributes of held people that were changed in place, then commit the database."""
+        for fullname, (person, stored) in self.held.items():
+            attributes = {attr: value for attr, value in person.__dict__.items() if attr not in UNSAVED_ATTRIBUTES}
+            if json.dumps(attributes, sort_keys=True) == stored:
+                continue
+            stored = json.loads(stored)
+            for attr, value in attributes.items():
+                if attr not in stored or stored[attr] != value:
+                    self.source.set_attribute(fullname, attr, value)
+            for attr in stored.keys() - attributes.keys():
+                self.source.delete_attribute(fullname, attr)
+        self.held.clear()
+        self.source.commit()
+
+    def values(self):
+        return (self._person(fullname) for fullname in self)
+
+    def items(self):
+        return ((fullname, self._person(fullname)) for fullname in self)
+
+    def __setitem__(self, fullname, person):
+        attributes = {attr: value for attr, value in person.__dict__.items() if attr not in UNSAVED_ATTRIBUTES}
+        self.source.add_person(fullname, attributes)
+        self.loaded[fullname] = person
+        self.held[fullname] = (person, json.dumps(attributes, sort_keys=True))
+
+    def __delitem__(self, fullname):
+        if not self.source.remove_person(fullname):
+            raise KeyError(fullname)
+        self.loaded.pop(fullname, None)
+        self.held.pop(fullname, None)
+
+    def __contains__(self, fullname):
+        return fullname in self.loaded or self.source.has_person(fullname)
+
+    def __iter__(self):
+        return self._names(False)
+
+    def __reversed__(self):
+        return self._names(True)
+
+    def _names(self, reverse):
+        # Names walked past are cached by the store, since walking every person usually precedes walking their relationships
+        ids, names = self.group.store.ids.cache, self.group.store.names.cache
+        for name_id, fullname in self.source.people(reverse):
+            ids[fullname] = name_id
+            names[name_id] = fullname
+            yield fullname
+
+    def __len__(self):
+        return self.source.person_count()
+
+
+class RelationshipView:
+    """Live, list-like view of one person's targets for one relationship type in a Group's RelationshipStore."""
+    __slots__ = ('group', 'store', 'name', 'relationship')
+
+    def __init__(self, group, name, relationship):
+        self.group = group
+        self.store = group.store
+        self.name = name
+        self.relationship = relationship
+
+    def __iter__(self):
+        return iter(self.store.neighbors(self.name, self.relationship))
+
+    def __len__(self):
+        return self.store.degree(self.name, self.relationship)
+
+    def __contains__(self, target):
+        return self.store.has_edge(self.name, target, self.relationship)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def append(self, target):
+        self.group._add_arc(self.name, target, self.relationship)
+
+    def remove(self, target):
+        if not self.group._remove_arc(self.name, target, self.relationship):
+            raise ValueError(f'"{target}" is not in {self.name}\'s {self.relationship}')
+
+
+class GraphView:
+    """Read-only, MultiDiGraph-style view over the relationships of a Group, read straight from its store.
+
+    Nodes are the people in the group and every edge is keyed by its relationship type, with edge
+    data {'relationship': type, 'directed': bool}. Undirected relationships can be followed from
+    either end but are listed once by edges(). Nothing is copied, so the view always reflects the
+    group, and narrowing it to a set of relationship types with subgraph() is O(1).
+    """
+    def __init__(self, group, relationships=None):
+        self.group = group
+        self.store = group.store
+        self.relationship_filter = None if relationships is None else frozenset(relationships)
+
+    @property
+    def relationships(self):
+        """The relationship types in the view, in the order the group added them."""
+        return [
+            relationship for relationship in self.group.relationships
+            if self.relationship_filter is None or relationship in self.relationship_filter
+        ]
+
+    def subgraph(self, relationships):
+        """Return a view of only the given relationship types."""
+        return GraphView(self.group, relationships)
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return True
+
+    def __iter__(self):
+        return iter(self.group.people)
+
+    def __len__(self):
+        return len(self.group.people)
+
+    def __contains__(self, name):
+        return name in self.group.people
+
+    def nodes(self):
+        return self.group.people.keys()
+
+    def edge_data(self, relationship):
+        return {'relationship': relationship, 'directed': self.group.relationships[relationship] == 'directed'}
+
+    def _arcs(self, name, relationship, reverse=False):
+        """Yield the people 'name' is related to by one relationship type, following arcs backwards if reverse=True."""
+        person_id = self.store.ids.get(name)
+        if person_id is None:
+            return
+        if reverse and self.group.relationships[relationship] == 'directed':
+            target_ids = self.store._incoming(relationship).get(person_id, ())
+        else:
+            target_ids = self.store.adjacency.get(relationship, {}).get(person_id, ())
+        names, people = self.store.names, self.group.people
+        for target_id in target_ids:
+            if names[target_id] in people:
+                yield names[target_id]
+
+    def __getitem__(self, name):
+        """Return the adjacency of a person: {neighbour: {relationship: edge data}}, like MultiDiGraph.adj."""
+        adjacency = dict()
+        for relationship in self.relationships:
+            for target in self._arcs(name, relationship):
+                adjacency.setdefault(target, {})[relationship] = self.edge_data(relationship)
+        return adjacency
+
+    def successors(self, name):
+        """Yield each person 'name' is related to, once, whatever the relationship types."""
+        return iter(dict.fromkeys(target for relationship in self.relationships for target in self._arcs(name, relationship)))
+
+    neighbors = successors
+
+    def predecessors(self, name):
+        """Yield each person related to 'name', once, whatever the relationship types."""
+        return iter(dict.fromkeys(source for relationship in self.relationships for source in self._arcs(name, relationship, reverse=True)))
+
+    def has_edge(self, source, target, key=None):
+        """Whether source is related to target, by relationship type 'key' or by any type in the view."""
+        if source not in self.group.people or target not in self.group.people:
+            return False
+        relationships = self.relationships if key is None else [key] if key in self.relationships else []
+        return any(self.store.has_edge(source, target, relationship) for relationship in relationships)
+
+    def out_edges(self, name, keys=False, data=False):
+        """Yield the edges leaving a person, including the undirected edges they are at either end of."""
+        for relationship in self.relationships:
+            for target in self._arcs(name, relationship):
+                yield self._edge(name, target, relationship, keys, data)
+
+    def in_edges(self, name, keys=False, data=False):
+        """Yield the edges arriving at a person, including the undirected edges they are at either end of."""
+        for relationship in self.relationships:
+            for source in self._arcs(name, relationship, reverse=True):
+                yield self._edge(source, name, relationship, keys, data)
+
+    def edges(self, keys=False, data=False):
+        """Yield every edge in the view, listing each undirected edge only once."""
+        names = self.store.names
+        for relationship in self.relationships:
+            undirected = self.group.relationships[relationship] == 'undirected'
+            adjacency = self.store.adjacency.get(relationship, {})
+            for person_id, target_ids in adjacency.items():
+                if names[person_id] not in self.group.people:
+                    continue
+                for target_id in target_ids:
+                    # An undirected edge is held as an arc each way; list it from the end with the lower ID
+                    if undirected and target_id < person_id and person_id in adjacency.get(target_id, ()):
+                        continue
+                    if names[target_id] in self.group.people:
+                        yield self._edge(names[person_id], names[target_id], relationship, keys, data)
+
+    def _edge(self, source, target, relationship, keys, data):
+        edge = (source, target)
+        if keys:
+            edge += (relationship,)
+        if data:
+            edge += (self.edge_data(relationship),)
+        return edge
+
+    def out_degree(self, name):
+        return sum(1 for relationship in self.relationships for _ in self._arcs(name, relationship))
+
+    def in_degree(self, name):
+        return sum(1 for relationship in self.relationships for _ in self._arcs(name, relationship, reverse=True))
+
+    def degree(self, name):
+        return self.out_degree(name) + self.in_degree(name)
+
+    def number_of_edges(self):
+        return sum(1 for _ in self.edges())
+
+    def to_networkx(self):
+        """Copy the view into a networkx.MultiDiGraph, with an arc each way for every undirected edge."""
+        graph = nx.MultiDiGraph()
+        graph.add_nodes_from(self.group.people)
+        for source, target, relationship, data in self.edges(keys=True, data=True):
+            graph.add_edge(source, target, key=relationship, **data)
+            if not data['directed'] and source != target:
+                graph.add_edge(target, source, key=relationship, **data)
+        return graph
+
+
+class NameIndex:
+    """Case-insensitive substring and prefix index over the names of a group.
+
+    Each name is filed under every lowercased trigram it contains, so a substring query is answered
+    by intersecting the sets for its trigrams instead of scanning every name. Queries shorter than a
+    trigram match most names, so they walk the names in order and stop at the limit. Prefix queries
+    use a sorted list of lowercased names.
+    """
+    GRAM = 3
+
+    def __init__(self, names=()):
+        self.grams = dict()
+        self.order = dict()
+        self.sorted = []
+        self.serial = 0
+        for name in names:
+            self.add(name, keep_sorted=False)
+        self.sorted.sort()
+
+    def _grams(self, lowered):
+        return {lowered[i:i + self.GRAM] for i in range(len(lowered) - self.GRAM + 1)}
+
+    def add(self, name, keep_sorted=True):
+        if name in self.order:
+            return
+        self.order[name] = self.serial
+        self.serial += 1
+        lowered = name.lower()
+        for gram in self._grams(lowered):
+            self.grams.setdefault(gram, set()).add(name)
+        if keep_sorted:
+            bisect.insort(self.sorted, (lowered, name))
+        else:
+            self.sorted.append((lowered, name))
+
+    def remove(self, name):
+        if self.order.pop(name, None) is None:
+            return
+        lowered = name.lower()
+        for gram in self._grams(lowered):
+            names = self.grams[gram]
+            names.discard(name)
+            if not names:
+                del self.grams[gram]
+        del self.sorted[bisect.bisect_left(self.sorted, (lowered, name))]
+
+    def _first(self, names, limit):
+        """Return the names in the order they were added, keeping only the first 'limit' if given."""
+        if limit is not None and len(names) * 4 > len(self.order):
+            # Most names match, so walking them in order finds the first few sooner than ranking them all
+            names = names if isinstance(names, (set, dict)) else set(names)
+            return list(itertools.islice((name for name in self.order if name in names), limit))
+        if limit is None:
+            return sorted(names, key=self.order.__getitem__)
+        return heapq.nsmallest(limit, names, key=self.order.__getitem__)
+
+    def search(self, text, limit=None):
+        """Return the names containing 'text', ignoring case, in the order they were added."""
+        query = text.lower()
+        if len(query) < self.GRAM:
+            matches = (name for name in self.order if query in name.lower())
+            return list(itertools.islice(matches, limit))
+
+        # Intersect the trigram sets from the smallest up, then check the surviving candidates
+        sets = sorted((self.grams.get(query[i:i + self.GRAM], set()) for i in range(len(query) - self.GRAM + 1)), key=len)
+        candidates = sets[0]
+        for names in sets[1:]:
+            if not candidates:
+                break
+            candidates = candidates & names
+        if len(sets) > 1:
+            candidates = [name for name in candidates if query in name.lower()]
+        return self._first(candidates, limit)
+
+    def prefix(self, text, limit=None):
+        """Return the names starting with 'text', ignoring case, in alphabetical order."""
+        query = text.lower()
+        matches = []
+        for i in range(bisect.bisect_left(self.sorted, (query,)), len(self.sorted)):
+            lowered, name = self.sorted[i]
+            if not lowered.startswith(query) or len(matches) == limit:
+                break
+            matches.append(name)
+        return matches
 
 
 class Group:
     """Class to store a group of Person objects and the types of relationships among them."""
-    def __init__(self, filename=None):
-        """Optionally initialize the group using an existing json file."""
+    def __init__(self, filename=None, journaled=False, lazy=False):
+        """Optionally initialize the group using an existing json file.
+
+        With journaled=True, every later change is also recorded to a journal next to the file. With
+        lazy=True, heavy attributes such as bios are only read from a line-delimited file when first
+        accessed. Snapshots are lazy either way, and a plain json file is always parsed and loaded
+        whole, so lazy makes no difference to either. A SQLite database file (.db, .sqlite or
+        .sqlite3) is not loaded at all: the group is kept in it and reads and writes only the rows
+        involved, so it needs no journal.
+        """
         self.relationships = dict()
         self.people = dict()
         self.graphs = dict()
+        self.layouts = dict()
+        self._layout_versions = dict()
+        self.store = RelationshipStore()
+        self.journal = None
+        self.database = None
+        self.version = 0
+        self._name_index = None
+        self._path_cache = dict()
+        self._path_cache_version = 0
         if filename:
-            load_people_from_file(self, filename)
-    
+            load_people_from_file(self, filename, lazy)
+            if journaled and os.path.exists(filename) and self.database is None:
+                self.open_journal(filename)
+
+    def open_journal(self, filename, sync_every=64, compact_bytes=16 * 2 ** 20):
+        """Record every change to the group in an append-only journal next to the group file 'filename'.
+
+        Changes are fsynced once every 'sync_every' records, and the journal is folded back into the
+        group file by compact() once it grows past 'compact_bytes' (never, if compact_bytes is None).
+        """
+        self.close_journal()
+        self.journal = journal.Journal(journal.journal_path(filename), sync_every)
+        self.journal_filename = filename
+        self.compact_bytes = compact_bytes
+
+    def close_journal(self):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    def _record(self, op, **fields):
+        """Note a mutation: bump the group version and append it to the journal, if one is open."""
+        self.version += 1
+        if self.database is not None:
+            # People and arcs write their own rows; attributes are written as they change
+            if op == 'set':
+                self.database.set_attribute(fields['name'], fields['attr'], fields['value'])
+            elif op == 'delete':
+                self.database.delete_attribute(fields['name'], fields['attr'])
+        if self.journal:
+            self.journal.append({'op': op, **fields})
+            if self.compact_bytes is not None and self.journal.size > self.compact_bytes:
+                self.compact()
+
+    def compact(self):
+        """Fold the journal into the group file it sits next to, then empty it."""
+        self.save_group_to_file(self.journal_filename)
+        self.journal.rollback()
+
+    def _add_person(self, person):
+        """Register a new Person with the group and add them to every existing graph.
+
+        Arcs already stored to or from them, such as a relationship set before they were added,
+        become graph edges now that both ends are in the group.
+        """
+        fullname = person.fullname
+        self.people[fullname] = person
+        for graph in self.graphs.values():
+            graph.add_node(fullname)
+        if self.graphs and self.store.ids.get(fullname) is not None:
+            for relationship, graph in self.graphs.items():
+                graph.add_edges_from((fullname, target) for target in self.store.neighbors(fullname, relationship) if target in self.people)
+                graph.add_edges_from((source, fullname) for source in self.store.predecessors(fullname, relationship) if source in self.people)
+        if self._name_index:
+            self._name_index.add(fullname)
+        self._record('add_person', name=fullname)
+
+    @property
+    def name_index(self):
+        """The NameIndex over the people in the group, built the first time it is needed."""
+        if self._name_index is None:
+            self._name_index = NameIndex(self.people)
+        return self._name_index
+
+    def search_names(self, text, limit=None, prefix=False):
+        """Return the full names of people whose name contains 'text' (or starts with it, if prefix=True), ignoring case."""
+        if self.database is not None:
+            return self.database.search_names(text, limit, prefix)
+        if prefix:
+            return self.name_index.prefix(text, limit)
+        return self.name_index.search(text, limit)
+
+    def _add_arc(self, source, target, relationship):
+        """Add a single arc to the store, mirroring it into the relationship graph if one is being kept."""
+        if not self.store.add_edge(source, target, relationship):
+            return False
+        graph = self.graphs.get(relationship)
+        if graph is not None and source in self.people and target in self.people:
+            graph.add_edge(source, target)
+        self._record('add_arc', source=source, target=target, relationship=relationship, kind=self.relationships.get(relationship))
+        return True
+
+    def _remove_arc(self, source, target, relationship):
+        """Remove a single arc from the store and drop the graph edge once no arc backs it."""
+        if not self.store.remove_edge(source, target, relationship):
+            return False
+        graph = self.graphs.get(relationship)
+        if graph is not None and graph.has_edge(source, target):
+            if graph.is_directed() or not self.store.has_edge(target, source, relationship):
+                graph.remove_edge(source, target)
+        self._record('remove_arc', source=source, target=target, relationship=relationship)
+        return True
+
+    def add_edge(self, source, target, relationship):
+        """Add an edge between two people, in both directions if the relationship is undirected."""
+        added = self._add_arc(source, target, relationship)
+        if self.relationships.get(relationship) == 'undirected':
+            added = self._add_arc(target, source, relationship) or added
+        return added
+
+    def remove_edge(self, source, target, relationship):
+        """Remove an edge between two people, in both directions if the relationship is undirected."""
+        removed = self._remove_arc(source, target, relationship)
+        if removed and self.relationships.get(relationship) == 'undirected':
+            self._remove_arc(target, source, relationship)
+        return removed
+
+    def _parse_distinct(self, names, parsed):
+        """Parse each name not already in 'parsed', mapping raw name to full name (None if invalid)."""
+        new_names = [name for name in dict.fromkeys(names) if name not in parsed]
+        for name, (first, last, middle) in zip(new_names, parse_names(new_names)):
+            parsed[name] = (' '.join(filter(None, [first, middle, last])), (first, last, middle)) if first and last else None
+        return parsed
+
+    def add_people(self, names):
+        """Add many people at once, parsing each distinct name only once.
+
+        Returns a list of (row, message) errors for names that could not be added.
+        """
+        names = list(names)
+        parsed = self._parse_distinct((name for name in names if isinstance(name, str)), dict())
+        errors = []
+        for row, name in enumerate(names):
+            if not isinstance(name, str):
+                errors.append((row, f'Expected a name as a string, got {name!r}.'))
+                continue
+            if parsed[name] is None:
+                errors.append((row, f'The name "{name}" is invalid.'))
+                continue
+            fullname, parsed_name = parsed[name]
+            if fullname not in self.people:
+                Person(name, self, parsed_name)
+        return errors
+
+    def add_edges(self, edges):
+        """Add many relationships at once from (source, target, relationship, directed) rows.
+
+        Names are parsed once each and the direction of each relationship type is checked once, then
+        people and edges are added in a single pass. Rows that fail are skipped rather than stopping
+        the batch; returns a list of (row, message) errors.
+        """
+        candidates = []
+        rows = []
+        errors = []
+        parsed = dict()
+        kinds = dict()
+        for row, edge in enumerate(edges):
+            try:
+                source, target, relationship, directed = edge
+            except (TypeError, ValueError):
+                errors.append((row, f'Expected (source, target, relationship, directed), got {edge!r}.'))
+                continue
+            if not isinstance(source, str) or not isinstance(target, str):
+                errors.append((row, f'Expected names as strings, got {source!r} and {target!r}.'))
+                continue
+
+            # 'parent' is an alias for child in the other direction
+            if relationship == 'parent' and not directed:
+                source, target, relationship = target, source, 'child'
+
+            kind = 'directed' if directed else 'undirected'
+            if relationship not in kinds:
+                kinds[relationship] = self.relationships.get(relationship, kind)
+            if kinds[relationship] != kind:
+                errors.append((row, f'Relationship "{relationship}" is already saved as {kinds[relationship]}.'))
+                continue
+
+            candidates.append((row, source, target, relationship))
+
+        self._parse_distinct((name for _, source, target, _ in candidates for name in (source, target)), parsed)
+        for row, source, target, relationship in candidates:
+            invalid = [name for name in (source, target) if parsed[name] is None]
+            if invalid:
+                errors.append((row, f'The name "{invalid[0]}" is invalid.'))
+                continue
+            rows.append((source, target, relationship))
+        errors.sort(key=lambda error: error[0])
+
+        for relationship, kind in kinds.items():
+            self.relationships.setdefault(relationship, kind)
+        for source, target, relationship in rows:
+            for name in (source, target):
+                fullname, parsed_name = parsed[name]
+                if fullname not in self.people:
+                    Person(name, self, parsed_name)
+            self.add_edge(parsed[source][0], parsed[target][0], relationship)
+        return errors
+
     def remove_person(self, name):
-        if name not in self.people:
-            return
-        person = self.people[name]
+        """Remove a person along with every relationship to or from them."""
+        self.remove_people([name])
+
+    def remove_people(self, names):
+        """Remove many people at once along with every relationship to or from them.
+
+        Incoming edges are found through the store's reverse index, so the cost is proportional to
+        the degree of the people removed rather than the size of the group.
+        """
+        names = [name for name in dict.fromkeys(names) if name in self.people]
         for relationship in self.relationships:
-            if hasattr(person, relationship):
-                for other_name in getattr(person, relationship):
-                    person.remove_relationship(other_name, relationship)
-        del self.people[name]
+            # Collect the arcs first, so an arc between two removed people is only removed once
+            arcs = dict()
+            for name in names:
+                arcs.update(((name, target), None) for target in self.store.neighbors(name, relationship))
+                arcs.update(((source, name), None) for source in self.store.predecessors(name, relationship))
+            for source, target in arcs:
+                self._remove_arc(source, target, relationship)
+        for graph in self.graphs.values():
+            graph.remove_nodes_from(names)
+        for name in names:
+            del self.people[name]
+            if self._name_index:
+                self._name_index.remove(name)
+            self._record('remove_person', name=name)
         
-    def save_group_to_file(self, filename):
-        """Save the relationships and people in the group to a json file."""
-        data = {
-            'relationships': self.relationships,
-            'people': {
-                fullname: {
-                    attr: getattr(person, attr)
-                    for attr in dir(person)
-                    if not attr.startswith('__') and not callable(getattr(person, attr)) and attr != 'group'
+    def _record_builder(self):
+        """Return a function that builds the saved record of a person, as a dict with sorted keys.
+
+        The record holds the person's PERSON_FIELDS and extra attributes straight from their
+        instance dict, and their relationships straight from the store, with no reflection.
+        Lookups are resolved once, so one builder should be reused for every person in a save.
+        """
+        name_of, ids = self.store.names.__getitem__, self.store.ids
+        adjacency = [(relationship, self.store.adjacency.get(relationship, {})) for relationship in self.relationships]
+
+        def build(person):
+            attributes = person.__dict__
+            if '_pending' in attributes:
+                person._load_pending()
+            record = {field: attributes[field] for field in PERSON_FIELDS if field in attributes}
+            if len(record) + 1 < len(attributes):
+                # Anything else set on the person is saved as an extra attribute
+                record.update((attr, value) for attr, value in attributes.items() if attr not in UNSAVED_ATTRIBUTES)
+            person_id = ids.get(attributes['fullname'])
+            if person_id is not None:
+                for relationship, rows in adjacency:
+                    targets = rows.get(person_id)
+                    if targets:
+                        record[relationship] = list(map(name_of, targets))
+            return dict(sorted(record.items()))
+        return build
+
+    def iter_ndjson_lines(self):
+        """Yield the group as line-delimited json: a header with the relationships, then one line per person."""
+        header = {'relationships': self.relationships}
+        if self.layouts:
+            header['layouts'] = self.layouts
+        yield json.dumps(header) + '\n'
+        record = self._record_builder()
+        for person in self.people.values():
+            yield json.dumps(record(person)) + '\n'
+
+    def _snapshot_attributes(self, person, build_record):
+        """Return the json-encoded attributes a snapshot stores for a person, without their name or relationships."""
+        pending = person.__dict__.get('_pending')
+        if pending and isinstance(pending[0], snapshot.Snapshot):
+            # Attributes that were never decoded are copied straight from the snapshot they came from
+            source, index = pending
+            return source.attribute_bytes(index)
+        record = build_record(person)
+        for attr in ['fullname', *self.relationships]:
+            record.pop(attr, None)
+        return json.dumps(record).encode('utf-8')
+
+    def save_snapshot(self, filename):
+        """Save the group as a binary snapshot that can be memory-mapped back in."""
+        names = list(self.people)
+        index = {name: i for i, name in enumerate(names)}
+        adjacency = dict()
+        for relationship in self.relationships:
+            rows = adjacency[relationship] = []
+            for name in self.people:
+                row = []
+                for target in self.store.neighbors(name, relationship):
+                    if target not in index:
+                        index[target] = len(names)
+                        names.append(target)
+                    row.append(index[target])
+                rows.append(row)
+        record = self._record_builder()
+        attributes = [self._snapshot_attributes(person, record) for person in self.people.values()]
+        snapshot.write_snapshot(filename, self.relationships, names, len(self.people), attributes, adjacency, self.layouts)
+
+    def save_database(self, filename):
+        """Save the group as a new SQLite database."""
+        record = self._record_builder()
+        target = database.Database(filename)
+        try:
+            target.import_group(self.relationships, (record(person) for person in self.people.values()), self.layouts)
+        finally:
+            target.close()
+
+    def save_group_to_file(self, filename, indent=4):
+        """Save the relationships and people in the group to a json file.
+
+        With indent=None the json is written compactly, which is much faster for large groups.
+        Filenames ending in .ndjson or .jsonl are streamed out one person per line instead, and
+        filenames ending in .snap are saved as a binary snapshot and those ending in .db, .sqlite or
+        .sqlite3 as a SQLite database. The file is written next to 'filename' and renamed into
+        place, so a crash never leaves a partial file and people lazily loaded from the old file can
+        still read their attributes from it. Saving a group kept in a database to that same database
+        only commits it.
+        """
+        if self.database is not None and self.database.is_file(filename):
+            self.database.save_layouts(self.layouts)
+            self.people.commit()
+            return
+        temporary = f'{filename}.{uuid.uuid4().hex}.tmp'
+        try:
+            if snapshot.is_snapshot_file(filename):
+                self.save_snapshot(temporary)
+            elif database.is_database_file(filename):
+                self.save_database(temporary)
+                # A write-ahead log left by an earlier database at this path must not be replayed onto the new one
+                for suffix in ('-wal', '-shm'):
+                    if os.path.exists(filename + suffix):
+                        os.remove(filename + suffix)
+            elif is_ndjson_file(filename):
+                with open(temporary, 'w') as file:
+                    file.writelines(self.iter_ndjson_lines())
+            else:
+                record = self._record_builder()
+                data = {
+                    'relationships': self.relationships,
+                    'people': {fullname: record(person) for fullname, person in self.people.items()}
                 }
-                for fullname, person in self.people.items()
-            }
-        }
-        with open(filename, 'w') as file:
-            json.dump(data, file, indent=4)
+                if self.layouts:
+                    data['layouts'] = self.layouts
+                with open(temporary, 'w') as file:
+                    if indent is None:
+                        file.write(json.dumps(data, separators=(',', ':')))
+                    else:
+                        json.dump(data, file, indent=indent)
+            os.replace(temporary, filename)
+        finally:
+            if os.path.exists(temporary):
+                database.remove_database(temporary)
+
+    def build_relationship_graph(self, relationship):
+        """Build a fresh graph of one type of relationship from the adjacency store."""
+        if self.relationships[relationship] == 'undirected':
+            graph = nx.Graph()
+        else:
+            graph = nx.DiGraph()
+
+        # Add people as nodes
+        graph.add_nodes_from(self.people)
+
+        # Add relationships between people in the group as edges
+        names = self.store.names
+        for person_id, targets in self.store.adjacency.get(relationship, {}).items():
+            if names[person_id] not in self.people:
+                continue
+            for target_id in targets:
+                if names[target_id] in self.people:
+                    graph.add_edge(names[person_id], names[target_id])
+        return graph
 
-    def update_relationship_graphs(self):
-        """Create a graph for each type of relationship in the group."""
-        # Create separate graphs for each relationship type
-        for relationship, direction in self.relationships.items():
+    def neighbors(self, name, relationship):
+        """Return the names a person is related to by one relationship type, in the order they were added."""
+        return self.store.neighbors(name, relationship)
+
+    def degree(self, name, relationship):
+        """Return how many people a person is related to by one relationship type."""
+        return self.store.degree(name, relationship)
+
+    def relationship_types(self, name=None):
+        """Return the relationship types in the group, or only those the person 'name' has a relationship of."""
+        if name is None:
+            return list(self.relationships)
+        return [relationship for relationship in self.relationships if self.store.degree(name, relationship)]
+
+    def graph_view(self, relationships=None):
+        """Return a GraphView over the given relationship types, or all of them, without building any graph."""
+        return GraphView(self, relationships)
+
+    def update_relationship_graphs(self, verify=False):
+        """Create a graph for each type of relationship in the group.
+
+        Graphs are built once per relationship type and then kept up to date by every edit, so calling
+        this again only builds graphs for new relationship types. With verify=True, each existing graph
+        is also checked against a full rebuild.
+        """
+        for relationship in self.relationships:
             if relationship not in self.graphs:
-                if direction == 'undirected':
-                    self.graphs[relationship] = nx.Graph()
-                else:
-                    self.graphs[relationship] = nx.DiGraph()
-
-            # Add people as nodes
-            for fullname in self.people:
-                self.graphs[relationship].add_node(fullname)
-
-            # Add relationships as edges
-            for person in self.people.values():
-                if hasattr(person, relationship):
-                    for related_person_fullname in getattr(person, relationship):
-                        self.graphs[relationship].add_edge(person.fullname, related_person_fullname)
+                self.graphs[relationship] = self.build_relationship_graph(relationship)
+            elif verify:
+                assert nx.utils.graphs_equal(self.graphs[relationship], self.build_relationship_graph(relationship)), f'Graph for relationship "{relationship}" is out of sync with the group.'
     
+    def to_csr(self, relationships=None):
+        """Export relationships between people in the group as compressed sparse row arrays.
+
+        Returns (indptr, indices, names): row i holds the arcs of names[i], whose targets are
+        indices[indptr[i]:indptr[i + 1]] in ascending order. Several relationship types are merged
+        into one set of arcs, and undirected relationships appear as an arc in each direction.
+        """
+        relationships = relationships if relationships is not None else list(self.relationships)
+        names = list(self.people)
+        size = len(names)
+        rows = np.full(len(self.store.names), -1, dtype=np.int64)
+        for row, name in enumerate(names):
+            if name in self.store.ids:
+                rows[self.store.ids[name]] = row
+
+        source_ids, lengths, target_ids = [], [], []
+        for relationship in relationships:
+            assert relationship in self.relationships, f'Relationship type "{relationship}" is not in the group.'
+            # One pass over the rows, since a store kept in a database reads them afresh on every pass
+            for source_id, targets in self.store.adjacency.get(relationship, {}).items():
+                source_ids.append(source_id)
+                lengths.append(len(targets))
+                target_ids.extend(targets)
+        sources = np.repeat(rows[np.array(source_ids, dtype=np.int64)], lengths)
+        targets = rows[np.array(target_ids, dtype=np.int64)]
+
+        # Drop arcs touching names outside the group, then sort and deduplicate arcs merged from several types
+        inside = (sources >= 0) & (targets >= 0)
+        arcs = np.unique(sources[inside] * size + targets[inside])
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        if size:
+            np.cumsum(np.bincount(arcs // size, minlength=size), out=indptr[1:])
+            arcs %= size
+        return indptr, arcs, names
+
+    def _neighbor_ids(self, person_id, relationships, reverse):
+        """Yield (neighbor ID, relationship) pairs one step away, walking directed arcs backwards if reverse=True."""
+        for relationship in relationships:
+            if reverse and self.relationships[relationship] == 'directed':
+                neighbor_ids = self.store._incoming(relationship).get(person_id)
+            else:
+                neighbor_ids = self.store.adjacency.get(relationship, {}).get(person_id)
+            if neighbor_ids:
+                for neighbor_id in neighbor_ids:
+                    yield neighbor_id, relationship
+
+    def _expand(self, frontier, parents, depths, other_depths, relationships, reverse):
+        """Expand one level of a breadth-first search; returns the next frontier and the best meeting point found."""
+        next_frontier = []
+        meeting = None
+        for person_id in frontier:
+            for neighbor_id, relationship in self._neighbor_ids(person_id, relationships, reverse):
+                if neighbor_id in parents:
+                    continue
+                parents[neighbor_id] = (person_id, relationship)
+                depths[neighbor_id] = depths[person_id] + 1
+                next_frontier.append(neighbor_id)
+                if neighbor_id in other_depths:
+                    if meeting is None or depths[neighbor_id] + other_depths[neighbor_id] < depths[meeting] + other_depths[meeting]:
+                        meeting = neighbor_id
+        return next_frontier, meeting
+
+    def _search_path(self, source_id, target_id, relationships):
+        """Bidirectional breadth-first search between two person IDs, always growing the smaller frontier."""
+        forward, backward = {source_id: None}, {target_id: None}
+        forward_depths, backward_depths = {source_id: 0}, {target_id: 0}
+        forward_frontier, backward_frontier = [source_id], [target_id]
+        meeting = source_id if source_id == target_id else None
+        while meeting is None and forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = self._expand(forward_frontier, forward, forward_depths, backward_depths, relationships, False)
+            else:
+                backward_frontier, meeting = self._expand(backward_frontier, backward, backward_depths, forward_depths, relationships, True)
+        if meeting is None:
+            return None
+
+        # Walk back to the source and forward to the target from where the two searches met
+        names = self.store.names
+        path = []
+        person_id = meeting
+        while forward[person_id]:
+            previous_id, relationship = forward[person_id]
+            path.append((names[previous_id], relationship, names[person_id]))
+            person_id = previous_id
+        path.reverse()
+        person_id = meeting
+        while backward[person_id]:
+            next_id, relationship = backward[person_id]
+            path.append((names[person_id], relationship, names[next_id]))
+            person_id = next_id
+        return path
+
+    def find_path(self, source, target, relationships=None):
+        """Return the shortest chain of relationships leading from one person to another.
+
+        The path is a list of (person, relationship, next person) steps, searched across the given
+        relationship types (all of them by default); directed relationships are only followed in
+        their own direction. Returns an empty list if source is target, or None if there is no path.
+        Results are cached until the group next changes. Raises ValueError for a relationship type
+        the group does not have.
+        """
+        relationships = tuple(sorted(relationships if relationships is not None else self.relationships))
+        unknown = [relationship for relationship in relationships if relationship not in self.relationships]
+        if unknown:
+            raise ValueError(f'Relationship types {unknown} are not in the group.')
+        if self._path_cache_version != self.version:
+            self._path_cache.clear()
+            self._path_cache_version = self.version
+        key = (source, target, relationships)
+        if key not in self._path_cache:
+            source_id, target_id = self.store.ids.get(source), self.store.ids.get(target)
+            if source not in self.people or target not in self.people:
+                path = None
+            elif source == target:
+                # People with no relationships have no ID yet, but are still no steps from themselves
+                path = []
+            elif source_id is None or target_id is None:
+                path = None
+            else:
+                path = self._search_path(source_id, target_id, relationships)
+            self._path_cache[key] = path
+        path = self._path_cache[key]
+        return list(path) if path is not None else None
+
+    def degrees_of_separation(self, source, target, relationships=None):
+        """Return the number of relationships separating two people, or None if they are not connected."""
+        path = self.find_path(source, target, relationships)
+        return len(path) if path is not None else None
+
+    def edge_arrays(self, relationship):
+        """Return (names, sources, targets): each edge of a relationship once, as row numbers into names.
+
+        Directed and undirected edges alike are listed once, and self-relationships are left out.
+        """
+        indptr, indices, names = self.to_csr([relationship])
+        count = max(len(names), 1)
+        sources = np.repeat(np.arange(len(names)), np.diff(indptr))
+        low, high = np.minimum(sources, indices), np.maximum(sources, indices)
+        edges = np.unique(low[low != high] * count + high[low != high])
+        return names, edges // count, edges % count
+
+    def relationship_layout(self, relationship, iterations=None, seed=None):
+        """Return the position of every person in the layout of a relationship graph.
+
+        Positions are kept per relationship type and saved with the group. The first layout runs
+        COLD_ITERATIONS of graph_layout.force_layout; after that, people added since are placed
+        next to their neighbours and the existing layout is warm-started for WARM_ITERATIONS, so
+        the picture stays put. Nothing is recomputed if the group has not changed.
+        """
+        if self.layout_is_current(relationship):
+            return self.layouts[relationship]
+        names, sources, targets = self.edge_arrays(relationship)
+        result = graph_layout.update_layout(names, sources, targets, self.layouts.get(relationship, {}), iterations, seed)
+        self.set_relationship_layout(relationship, dict(zip(names, map(tuple, result.tolist()))), self.version)
+        return self.layouts[relationship]
+
+    def layout_is_current(self, relationship):
+        """Whether the saved layout of a relationship graph was computed for the group as it is now."""
+        return self._layout_versions.get(relationship) == self.version and len(self.layouts.get(relationship, ())) == len(self.people)
+
+    def set_relationship_layout(self, relationship, positions, version):
+        """Keep a layout of a relationship graph computed elsewhere, such as on another thread, from the group at 'version'."""
+        self.layouts[relationship] = positions
+        self._layout_versions[relationship] = version
+
     def plot_relationship_graph(self, relationship):
         """Plot a graph of a type of relationship."""
         plt.figure(figsize=(8, 6))
-        nx.draw(self.graphs[relationship], with_labels=True, node_size=500, node_color='skyblue', font_size=12, font_weight='bold')
+        nx.draw(self.graphs[relationship], pos=self.relationship_layout(relationship), with_labels=True, node_size=500, node_color='skyblue', font_size=12, font_weight='bold')
         plt.title(f"{relationship.capitalize()} Relationship Graph")
         plt.show()
+
+    def render_relationship_graph(self, relationship, filename, **options):
+        """Render a graph of a type of relationship to an image file without a display, simplifying it if it is large.
+
+        See render.draw_relationship_graph for the options, such as mode='bins' or mode='communities'.
+        """
+        render.render_relationship_graph(self, relationship, filename, **options)
         
 
 class Person:
     """Class to represent a person and list their relationships."""
-    def __init__(self, name, group):
-        """A Person is initialized using a name and the Group they belong to."""
+    def __init__(self, name, group, parsed_name=None):
+        """A Person is initialized using a name and the Group they belong to.
+
+        A (first, last, middle) tuple already returned by parse_name can be passed to skip parsing.
+        """
         # Parse name
-        self.firstname, self.lastname, self.middle = parse_name(name)
+        self.firstname, self.lastname, self.middle = parsed_name or parse_name(name)
         assert self.firstname and self.lastname, f'Person must be initialized with a valid full name; the name "name" is invalid.'
         self.fullname = ' '.join(filter(None, [self.firstname, self.middle, self.lastname]))
 
+        self.emails = []
+        self.links = []
+
         # Add person to group
         assert isinstance(group, Group), "Person must be initialized with a valid Group." 
         if self.fullname not in group.people:
-            group.people[self.fullname] = self
+            group._add_person(self)
         self.group = group
-        self.emails = []
-        self.links = []
+
+    @classmethod
+    def _from_source(cls, fullname, group, source, key):
+        """Create a Person whose attributes stay in a snapshot or database until they are first accessed."""
+        person = cls.__new__(cls)
+        object.__setattr__(person, '__dict__', {'fullname': fullname, 'group': group, '_pending': (source, key)})
+        return person
+
+    def _load_pending(self):
+        """Load the attributes left in a snapshot or file by a lazy load; returns False if there were none pending."""
+        pending = self.__dict__.pop('_pending', None)
+        if not pending:
+            return False
+        source, key = pending
+        self.__dict__.update(source.attributes(key))
+        return True
+
+    def __getattr__(self, attr):
+        """Expose each relationship the person has as a view onto the group's RelationshipStore."""
+        group = self.__dict__.get('group')
+        if group is not None and attr in group.relationships and group.store.degree(self.fullname, attr):
+            return RelationshipView(group, self.fullname, attr)
+        if self._load_pending():
+            return getattr(self, attr)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{attr}'")
+
+    def __setattr__(self, attr, value):
+        group = self.__dict__.get('group')
+        if group is not None and attr in group.relationships:
+            # Undirected relationships are set at both ends, like add_undirected_relationship does
+            value = list(value)
+            for target in group.store.neighbors(self.fullname, attr):
+                group.remove_edge(self.fullname, target, attr)
+            for target in value:
+                group.add_edge(self.fullname, target, attr)
+        else:
+            self._load_pending()
+            super().__setattr__(attr, value)
+            if group is not None:
+                group._record('set', name=self.fullname, attr=attr, value=value)
+
+    def __delattr__(self, attr):
+        group = self.__dict__.get('group')
+        if group is not None and attr in group.relationships:
+            for target in group.store.neighbors(self.fullname, attr):
+                group.remove_edge(self.fullname, target, attr)
+        else:
+            self._load_pending()
+            super().__delattr__(attr)
+            if group is not None:
+                group._record('delete', name=self.fullname, attr=attr)
+
+    def attribute_changed(self, attr):
+        """Record an attribute that was changed in place, such as an email appended to 'emails'."""
+        self.group._record('set', name=self.fullname, attr=attr, value=getattr(self, attr))
+
+    def __dir__(self):
+        self._load_pending()
+        return list(super().__dir__()) + self.relationship_types()
 
     def add_undirected_relationship(self, name, relationship):
         """Add a mutual relationship (such as 'friend') to the Person 'name'."""
@@ -137,14 +1467,8 @@ class Person:
         else:
             assert self.group.relationships[relationship] == 'undirected', f'Relationship "{relationship}" is already saved as directed.'
 
-        # Initialize self relationship
-        if not hasattr(self, relationship):
-            setattr(self, relationship, [])
-
         # Set the relationship of both self and target
-        if target_name not in getattr(self, relationship):
-            getattr(self, relationship).append(target_name)
-            target.add_undirected_relationship(self.fullname, relationship)
+        self.group.add_edge(self.fullname, target_name, relationship)
 
     def add_directed_relationship(self, name, relationship):
         """Add a directed relationship (such as 'children')."""
@@ -153,55 +1477,523 @@ class Person:
             self.group.relationships[relationship] = 'directed'
         else:
             assert self.group.relationships[relationship] == 'directed', f'Relationship "{relationship}" is already saved as undirected.'
-        
-        # Initialize self relationship
-        if not hasattr(self, relationship):
-            setattr(self, relationship, [])
 
         # Find target
         target = Person(name, self.group)
         target_name = target.fullname
-        if target_name in self.group.people:
-            target = self.group.people[target_name]
-        
+
         # Set the relationship of self to target
-        if target_name not in getattr(self, relationship):
-            getattr(self, relationship).append(target_name)
+        self.group.add_edge(self.fullname, target_name, relationship)
     
+    def neighbors(self, relationship):
+        """Return the names this person is related to by one relationship type, in the order they were added."""
+        return self.group.store.neighbors(self.fullname, relationship)
+
+    def degree(self, relationship):
+        """Return how many people this person is related to by one relationship type."""
+        return self.group.store.degree(self.fullname, relationship)
+
+    def relationship_types(self):
+        """Return the relationship types this person has at least one relationship of."""
+        return self.group.relationship_types(self.fullname)
+
     def get_relationships(self):
-        relationships = {}
-        for attr_name in dir(self):
-            if not attr_name.startswith('__') and not callable(getattr(self, attr_name)):
-                attr_value = getattr(self, attr_name)
-                if isinstance(attr_value, list) and attr_name != 'middle':
-                    relationships[attr_name] = attr_value
-        return relationships
+        """Return a view of each relationship type this person has, keyed by type."""
+        return {relationship: RelationshipView(self.group, self.fullname, relationship) for relationship in self.relationship_types()}
     
     def remove_relationship(self, name, relationship):
-        if hasattr(self, relationship):
-            if name in getattr(self, relationship):
-                getattr(self, relationship).remove(name)
-                if not getattr(self, relationship):
-                    delattr(self, relationship)
-                self.group.people[name].remove_relationship(self.fullname, relationship)
+        """Remove the relationship to the Person 'name', and the reverse edge if it is undirected."""
+        self.group.remove_edge(self.fullname, name, relationship)
+
+
+def merge_relationships(group, relationships):
+    """Add saved relationship types to a Group, ensuring any it already has are of the same kind."""
+    for relationship, kind in relationships.items():
+        if relationship in group.relationships:
+            # If a relationship exists in both the saved group and the existing group, ensure they have the same type
+            assert kind == group.relationships[relationship], f'Conflicting relationship: existing relationship "{relationship}" is {group.relationships[relationship]}, while new relationship "{relationship}" is {kind}'
+        else:
+            group.relationships[relationship] = kind
+
+
+def merge_layouts(group, layouts):
+    """Add saved layout positions to a Group, keeping the positions of people it has already laid out."""
+    for relationship, positions in layouts.items():
+        merged = group.layouts.setdefault(relationship, {})
+        for name, position in positions.items():
+            merged.setdefault(name, tuple(position))
+
+
+def mark_layouts_current(group):
+    """Treat the layouts just loaded with a group as computed for it, if they place everyone in it.
+
+    Layouts are saved with the group they were computed for, so opening a file does not lay out
+    its graphs again; changes made after loading, such as a replayed journal, still do.
+    """
+    for relationship, positions in group.layouts.items():
+        if len(positions) == len(group.people):
+            group._layout_versions[relationship] = group.version
+
+
+def load_person(group, fullname, attrs, source=None, key=None):
+    """Create a Person in the Group from their saved attributes.
+
+    If a source is given, the LAZY_ATTRIBUTES are left out and read from source.attributes(key)
+    the first time the person is accessed. Saved relationships are added one arc at a time, since
+    a saved undirected relationship already lists each end's arc with that person.
+    """
+    person = Person(fullname, group)
+    lazy = [attr for attr in LAZY_ATTRIBUTES if attr in attrs] if source is not None else []
+    for attr, values in attrs.items():
+        if attr in group.relationships:
+            for target in values:
+                group._add_arc(person.fullname, target, attr)
+        elif attr not in lazy:
+            setattr(person, attr, values)
+    if lazy:
+        for attr in lazy:
+            person.__dict__.pop(attr, None)
+        person.__dict__['_pending'] = (source, key)
+    return person
+
+
+def rebuild_relationship_graphs(group):
+    """Rebuild the graphs a Group keeps, since edges to people loaded later could not be mirrored into them."""
+    for relationship in group.graphs:
+        group.graphs[relationship] = group.build_relationship_graph(relationship)
+
+
+def _lines_with_offsets(file):
+    """Yield each line of a binary file along with the offset it starts at."""
+    offset = 0
+    for line in file:
+        yield offset, line
+        offset += len(line)
+
+
+def stream_people_from_file(group, filename, lazy=False):
+    """Load Person objects from a line-delimited group file into Group object, yielding each as it is read.
+
+    The file is read one line at a time, so memory stays flat however large the group is. With
+    lazy=True, each person's LAZY_ATTRIBUTES are only read back from their line when first accessed.
+    """
+    source = NDJSONSource(filename) if lazy else None
+    with open(filename, 'rb') as file:
+        records = ((offset, json.loads(line)) for offset, line in _lines_with_offsets(file) if line.strip())
+        _, header = next(records, (0, {}))
+        assert 'relationships' in header, f'File "{filename}" does not start with a relationships header.'
+        merge_relationships(group, header['relationships'])
+        merge_layouts(group, header.get('layouts', {}))
+        for offset, attrs in records:
+            yield load_person(group, attrs['fullname'], attrs, source, offset)
+    rebuild_relationship_graphs(group)
+
+
+def load_snapshot(group, filename):
+    """Load Person objects from a binary snapshot file into Group object.
+
+    An empty Group is opened straight from the memory-mapped file: names are read up front, while
+    relationships and attributes are decoded only when each person is touched. Loading into a Group
+    that already has people merges the snapshot in eagerly.
+    """
+    source = snapshot.Snapshot(filename)
+    names = source.names()
+    fresh = not group.people and not group.relationships and not group.store.names
+    merge_relationships(group, source.relationships)
+    merge_layouts(group, source.layouts)
+
+    if fresh:
+        group.store.names = names
+        group.store.ids = dict(zip(names, range(len(names))))
+        for relationship in source.relationships:
+            group.store.adjacency[relationship] = LazyAdjacency(*source.csr(relationship))
+        group.people = {name: Person._from_source(name, group, source, i) for i, name in enumerate(names[:source.person_count])}
+        return
+
+    csr = {relationship: source.csr(relationship) for relationship in source.relationships}
+    for i, name in enumerate(names[:source.person_count]):
+        attrs = source.attributes(i)
+        for relationship, (indptr, indices) in csr.items():
+            if indptr[i] != indptr[i + 1]:
+                attrs[relationship] = [names[j] for j in indices[indptr[i]:indptr[i + 1]]]
+        load_person(group, name, attrs)
+    rebuild_relationship_graphs(group)
+
+
+def load_database(group, filename):
+    """Open a SQLite group database into Group object.
+
+    An empty Group is kept in the database from then on: its people, relationship types and store
+    read and write the database's rows directly, and a file that does not exist yet is created.
+    Loading into a Group that already has people merges the database in and closes it.
+    """
+    source = database.Database(filename)
+    fresh = not group.people and not group.relationships and not group.store.names and group.database is None
+    merge_layouts(group, source.metadata('layouts', {}))
+    if fresh:
+        group.database = source
+        group.relationships = DatabaseRelationships(source)
+        group.store = DatabaseStore(source)
+        group.people = DatabasePeople(group, source)
+        return
+
+    try:
+        relationships = source.relationships()
+        merge_relationships(group, relationships)
+        for name_id, fullname in source.people():
+            attrs = source.attributes(fullname)
+            for relationship in relationships:
+                targets = source.targets(relationship, name_id)
+                if targets:
+                    attrs[relationship] = [source.name(target_id) for target_id in targets]
+            load_person(group, fullname, attrs)
+        rebuild_relationship_graphs(group)
+    finally:
+        source.close()
+
+
+def replay_journal(group, path, end=None):
+    """Apply the mutations recorded in a journal to a Group, up to byte 'end' of the journal if given."""
+    for record in journal.read_journal(path, end):
+        op = record['op']
+        if op == 'add_person':
+            if record['name'] not in group.people:
+                Person(record['name'], group)
+        elif op == 'remove_person':
+            group.remove_person(record['name'])
+        elif op == 'set':
+            setattr(group.people[record['name']], record['attr'], record['value'])
+        elif op == 'delete':
+            delattr(group.people[record['name']], record['attr'])
+        elif op == 'add_arc':
+            group.relationships.setdefault(record['relationship'], record['kind'])
+            group._add_arc(record['source'], record['target'], record['relationship'])
+        elif op == 'remove_arc':
+            group._remove_arc(record['source'], record['target'], record['relationship'])
+
 
+def convert_group_file(source, destination):
+    """Convert a group file between the json, line-delimited json, snapshot and database formats, based on the file extensions."""
+    Group(source).save_group_to_file(destination)
 
-def load_people_from_file(group, filename):
-    """Load Person objects from saved json file into Group object."""
+
+def load_people_from_file(group, filename, lazy=False, journal_end=None):
+    """Load Person objects from saved json, line-delimited json, snapshot or database file into Group object.
+
+    Any changes recorded in a journal next to the file are replayed on top of it, up to the
+    journal position 'journal_end' if given, such as a Journal.mark() taken earlier. With lazy=True,
+    the LAZY_ATTRIBUTES of people from line-delimited files are read only when first accessed;
+    snapshots opened into an empty Group are always lazy, and json files are always read whole.
+    Databases opened into an empty Group keep it, as load_database describes.
+    """
+    if database.is_database_file(filename):
+        load_database(group, filename)
+        mark_layouts_current(group)
+        return
     try:
-        with open(filename, 'r') as file:
-            data = json.load(file)
-            relationships = data.get('relationships', {})
-            for relationship, kind in relationships.items():
-                if relationship in group.relationships:
-                    # If a relationship exists in both the saved group and the existing group, ensure they have the same type
-                    assert kind == group.relationships[relationship], f'Conflicting relationship: existing relationship "{relationship}" is {group.relationships[relationship]}, while new relationship "{relationship}" is {kind}'
-                else:
-                    group.relationships[relationship] = kind
-            # Create new Person objects for each person in the saved group
-            for fullname, attrs in data.get('people', {}).items():
-                person = Person(fullname, group)
-                for attr, values in attrs.items():
-                    setattr(person, attr, values)
+        if snapshot.is_snapshot_file(filename):
+            load_snapshot(group, filename)
+        elif is_ndjson_file(filename):
+            for _ in stream_people_from_file(group, filename, lazy):
+                pass
+        else:
+            with open(filename, 'r') as file:
+                data = json.load(file)
+                merge_relationships(group, data.get('relationships', {}))
+                merge_layouts(group, data.get('layouts', {}))
+                # Create new Person objects for each person in the saved group
+                for fullname, attrs in data.get('people', {}).items():
+                    load_person(group, fullname, attrs)
+                rebuild_relationship_graphs(group)
     except FileNotFoundError:
-        print(f"File '{filename}' not found.")
\ No newline at end of file
+        print(f"File '{filename}' not found.")
+    mark_layouts_current(group)
+
+    if os.path.exists(journal.journal_path(filename)):
+        replay_journal(group, journal.journal_path(filename), journal_end)
+
+
+
+# How merge_group_files settles an attribute that differs between files, and where keep_both keeps the losing values
+ATTRIBUTE_POLICIES = ('last_writer_wins', 'keep_both')
+MERGE_CONFLICTS = 'merge_conflicts'
+# Values that never replace another in a merge, such as the empty emails and links every person starts with
+EMPTY_VALUES = (None, '', [], {})
+
+
+def read_group_file(filename):
+    """Read a group file of any format into plain data that can be sent between processes.
+
+    Returns {'filename', 'relationships', 'layouts', 'people'}, where 'people' holds the saved
+    record of each person, relationships included, as save_group_to_file would write it. Raises
+    FileNotFoundError if there is no such file, rather than reading it as an empty group (or, for a
+    database, creating it).
+    """
+    if not os.path.isfile(filename):
+        raise FileNotFoundError(f"Group file '{filename}' not found.")
+    group = Group(filename)
+    record = group._record_builder()
+    data = {
+        'filename': filename,
+        'relationships': dict(group.relationships),
+        'layouts': group.layouts,
+        'people': [record(person) for person in group.people.values()],
+    }
+    if group.database is not None:
+        group.database.close()
+    return data
+
+
+def _merge_value(current, incoming, policy, path, conflicts):
+    """Merge one incoming attribute value into the current one, noting every conflict as (path, current, incoming, kept).
+
+    With keep_both, lists are joined without repeats, dicts are merged key by key, and any other
+    value that differs keeps the current one; the caller keeps the incoming value elsewhere.
+    Filling in or leaving one of the EMPTY_VALUES is not a conflict.
+    """
+    if current == incoming or incoming in EMPTY_VALUES:
+        return current
+    if current in EMPTY_VALUES:
+        return incoming
+    if policy == 'keep_both':
+        if isinstance(current, list) and isinstance(incoming, list):
+            return current + [value for value in incoming if value not in current]
+        if isinstance(current, dict) and isinstance(incoming, dict):
+            merged = dict(current)
+            for key, value in incoming.items():
+                merged[key] = _merge_value(current[key], value, policy, f'{path}.{key}', conflicts) if key in current else value
+            return merged
+        conflicts.append((path, current, incoming, current))
+        return current
+    conflicts.append((path, current, incoming, incoming))
+    return incoming
+
+
+def merge_group_files(filenames, group=None, attributes='last_writer_wins', processes=None):
+    """Merge many group files of any format into one Group, reading them in parallel; returns a report.
+
+    Files are read by a pool of 'processes' worker processes (one per CPU by default; with
+    processes=1 they are read in this process), then every relationship type is checked for
+    conflicting kinds across the files and 'group' before anything is merged; a missing file
+    raises FileNotFoundError before anything is merged too. Relationships are
+    merged as the union of every file's arcs. An attribute set differently in several files is
+    settled by the 'attributes' policy, taking the files in order after anything already in the
+    group, and ignoring EMPTY_VALUES:
+        last_writer_wins   the value from the last file wins
+        keep_both          lists are joined and dicts merged key by key; for any other value the
+                           first one is kept, and the others are kept in the person's
+                           MERGE_CONFLICTS attribute as {attribute path: [values]}
+    The report holds the 'files' merged, the number of 'people_added', 'people_merged' (people
+    already in the group or in an earlier file) and 'arcs_added', and every attribute conflict in
+    'conflicts' as a dict of the person, attribute path, file, previous and incoming values, and
+    the value kept.
+    """
+    assert attributes in ATTRIBUTE_POLICIES, f'Unknown attribute policy "{attributes}".'
+    group = group if group is not None else Group()
+    filenames = list(filenames)
+    if processes == 1:
+        files = list(map(read_group_file, filenames))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            files = list(pool.map(read_group_file, filenames))
+
+    # Every relationship type must have one kind across the group and all the files
+    kinds = {relationship: {kind: ['the group']} for relationship, kind in group.relationships.items()}
+    for data in files:
+        for relationship, kind in data['relationships'].items():
+            kinds.setdefault(relationship, {}).setdefault(kind, []).append(data['filename'])
+    clashes = [
+        f'"{relationship}" is ' + ' but '.join(f'{kind} in {", ".join(sources)}' for kind, sources in by_kind.items())
+        for relationship, by_kind in kinds.items() if len(by_kind) > 1
+    ]
+    assert not clashes, 'Conflicting relationship kinds: ' + '; '.join(clashes)
+
+    report = {'files': filenames, 'people_added': 0, 'people_merged': 0, 'arcs_added': 0, 'conflicts': []}
+    for data in files:
+        merge_relationships(group, data['relationships'])
+        merge_layouts(group, data['layouts'])
+        for record in data['people']:
+            fullname = record['fullname']
+            person = group.people.get(fullname)
+            if person is None:
+                load_person(group, fullname, {attr: value for attr, value in record.items() if attr not in data['relationships']})
+                report['people_added'] += 1
+            else:
+                report['people_merged'] += 1
+                person._load_pending()
+                for attr, value in record.items():
+                    if attr in data['relationships'] or attr == 'fullname' or value in EMPTY_VALUES:
+                        continue
+                    if attr not in person.__dict__:
+                        setattr(person, attr, value)
+                        continue
+                    conflicts = []
+                    merged = _merge_value(person.__dict__[attr], value, attributes, attr, conflicts)
+                    if merged != person.__dict__[attr]:
+                        setattr(person, attr, merged)
+                    for path, previous, incoming, kept in conflicts:
+                        report['conflicts'].append({'person': fullname, 'attribute': path, 'file': data['filename'], 'previous': previous, 'incoming': incoming, 'kept': kept})
+                    if attributes == 'keep_both' and conflicts:
+                        kept_values = dict(person.__dict__.get(MERGE_CONFLICTS, {}))
+                        for path, _, incoming, _ in conflicts:
+                            kept_values[path] = kept_values.get(path, []) + [incoming]
+                        setattr(person, MERGE_CONFLICTS, kept_values)
+            for relationship in data['relationships']:
+                for target in record.get(relationship, ()):
+                    report['arcs_added'] += group._add_arc(fullname, target, relationship)
+    rebuild_relationship_graphs(group)
+    return report
+
+# Operations timed by Instrumentation, as (owner, attribute, operation name). Owners are looked up
+# by name when instrumentation is enabled, so nothing here costs anything while it is disabled.
+INSTRUMENTED = (
+    ('backend', 'parse_name', 'parse_name'),
+    ('Group', 'add_edge', 'add_relationship'),
+    ('Group', 'add_edges', 'add_relationships'),
+    ('Group', 'remove_edge', 'remove_relationship'),
+    ('Group', '_add_arc', 'add_arc'),
+    ('Group', '_remove_arc', 'remove_arc'),
+    ('Group', 'remove_people', 'remove_people'),
+    ('Group', 'build_relationship_graph', 'build_relationship_graph'),
+    ('Group', 'update_relationship_graphs', 'update_relationship_graphs'),
+    ('backend', 'load_people_from_file', 'load'),
+    ('Group', 'save_group_to_file', 'save'),
+    ('backend', 'merge_group_files', 'merge'),
+)
+# Latency histogram buckets: bucket i holds calls that took under 2 ** i microseconds
+HISTOGRAM_BUCKETS = 32
+
+
+class Instrumentation:
+    """Opt-in call counts, total time and latency histograms for the hot operations in INSTRUMENTED.
+
+    Enabling swaps each operation for a timed wrapper and disabling puts the original back, so
+    while disabled the operations run exactly as if instrumentation did not exist. Module functions
+    imported by name elsewhere before enabling are not timed there. Setting the
+    GROUP_INSTRUMENTATION environment variable enables it on import.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.originals = dict()
+        self.stats = dict()
+
+    def _owner(self, name):
+        return globals() if name == 'backend' else vars(globals()[name])
+
+    def _timed(self, function, operation):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(operation, time.perf_counter() - start)
+        for attribute in ('cache_info', 'cache_clear'):
+            if hasattr(function, attribute):
+                setattr(timed, attribute, getattr(function, attribute))
+        return timed
+
+    def enable(self):
+        """Start timing every operation in INSTRUMENTED."""
+        if self.enabled:
+            return
+        for owner, attribute, operation in INSTRUMENTED:
+            function = self._owner(owner)[attribute]
+            self.originals[owner, attribute] = function
+            wrapper = self._timed(function, operation)
+            if owner == 'backend':
+                globals()[attribute] = wrapper
+            else:
+                setattr(globals()[owner], attribute, wrapper)
+        self.enabled = True
+
+    def disable(self):
+        """Stop timing and restore the original operations; the stats collected so far are kept."""
+        if not self.enabled:
+            return
+        for (owner, attribute), function in self.originals.items():
+            if owner == 'backend':
+                globals()[attribute] = function
+            else:
+                setattr(globals()[owner], attribute, function)
+        self.originals.clear()
+        self.enabled = False
+
+    def reset(self):
+        """Forget every stat collected so far."""
+        with self.lock:
+            self.stats = dict()
+
+    def record(self, operation, seconds):
+        """Count one call of 'operation' that took 'seconds'."""
+        bucket = min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+        with self.lock:
+            stat = self.stats.get(operation)
+            if stat is None:
+                stat = self.stats[operation] = {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'histogram': [0] * HISTOGRAM_BUCKETS}
+            stat['calls'] += 1
+            stat['seconds'] += seconds
+            stat['max_seconds'] = max(stat['max_seconds'], seconds)
+            stat['histogram'][bucket] += 1
+
+    def snapshot(self):
+        """Return the stats of every operation called so far, keyed by operation.
+
+        Each holds the number of 'calls', their total and mean 'seconds', the slowest call, and a
+        'histogram' of [upper bound in seconds, calls] pairs for every bucket with calls in it.
+        """
+        with self.lock:
+            stats = {operation: dict(stat, histogram=list(stat['histogram'])) for operation, stat in self.stats.items()}
+        for stat in stats.values():
+            stat['mean_seconds'] = stat['seconds'] / stat['calls']
+            stat['histogram'] = [[2 ** bucket / 1e6, calls] for bucket, calls in enumerate(stat['histogram']) if calls]
+        return stats
+
+    def dump(self, filename):
+        """Write the current stats snapshot to a json file."""
+        with open(filename, 'w') as file:
+            json.dump(self.snapshot(), file, indent=4)
+
+    @contextlib.contextmanager
+    def profile(self, filename=None, memory=False, limit=25):
+        """Profile the enclosed block with cProfile, or trace its memory allocations with tracemalloc if memory=True.
+
+        Yields a dict that is filled in when the block ends: the 'report' text of the 'limit'
+        costliest functions or allocation sites, and with tracemalloc the 'current_bytes' and
+        'peak_bytes' allocated. If a filename is given, cProfile stats are dumped there for pstats
+        or snakeviz, and the tracemalloc report is written there as text.
+        """
+        result = dict()
+        if memory:
+            tracing = tracemalloc.is_tracing()
+            if not tracing:
+                tracemalloc.start()
+            try:
+                yield result
+            finally:
+                allocations = tracemalloc.take_snapshot()
+                result['current_bytes'], result['peak_bytes'] = tracemalloc.get_traced_memory()
+                if not tracing:
+                    tracemalloc.stop()
+                result['report'] = '\n'.join(str(line) for line in allocations.statistics('lineno')[:limit])
+                if filename:
+                    with open(filename, 'w') as file:
+                        file.write(result['report'])
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield result
+            finally:
+                profiler.disable()
+                stream = io.StringIO()
+                pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+                result['report'] = stream.getvalue()
+                if filename:
+                    profiler.dump_stats(filename)
+
+
+instrumentation = Instrumentation()
+if os.environ.get('GROUP_INSTRUMENTATION'):
+    instrumentation.enable()
@@ -0,0 +1 @@
+"""Benchmarks for the backend, run as modules from the repository root, e.g. python -m benchmarks.save"""
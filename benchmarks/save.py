@@ -0,0 +1,56 @@
+"""Compare saving a group with the schema-driven serializer against the old dir()/getattr reflection.
+
+Usage: python -m benchmarks.save [people]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+from benchmarks import workload
+
+
+def reflection_record(person):
+    """The person record as save_group_to_file used to build it, by reflection over dir(person)."""
+    return {
+        attr: getattr(person, attr)
+        for attr in dir(person)
+        if not attr.startswith('__') and not callable(getattr(person, attr)) and attr != 'group'
+    }
+
+
+def reflection_save(group, filename):
+    data = {
+        'relationships': group.relationships,
+        'people': {fullname: reflection_record(person) for fullname, person in group.people.items()},
+    }
+    with open(filename, 'w') as file:
+        json.dump(data, file, indent=4, default=list)
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main(size=100000):
+    group = workload.build_group(workload.generate(size))
+    with tempfile.TemporaryDirectory() as directory:
+        old, new, compact = (os.path.join(directory, name) for name in ('old.json', 'new.json', 'compact.json'))
+        results = {
+            'people': size,
+            'reflection_seconds': timed(reflection_save, group, old),
+            'schema_seconds': timed(group.save_group_to_file, new),
+            'schema_compact_seconds': timed(group.save_group_to_file, compact, indent=None),
+        }
+        with open(old) as old_file, open(new) as new_file:
+            assert old_file.read() == new_file.read(), 'The schema-driven serializer wrote a different file.'
+    results['speedup'] = results['reflection_seconds'] / results['schema_seconds']
+    results['compact_speedup'] = results['reflection_seconds'] / results['schema_compact_seconds']
+    print(json.dumps(results, indent=4))
+    return results
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,165 @@
+"""Time the main backend operations on synthetic groups and emit the results as json.
+
+Usage:
+    python -m benchmarks.suite [--sizes 1000 10000 ...] [--output results.json]
+    python -m benchmarks.suite --compare before.json after.json
+
+Every result records the group size, the operation, how many calls were timed, the total and
+per-call seconds, and the commit it was run on, so runs from two commits can be compared.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+from backend import Group, Person, load_people_from_file
+from benchmarks import workload
+
+SIZES = (1000, 10000, 100000, 1000000)
+SAMPLE = 1000
+FORMATS = ('.json', '.ndjson', '.snap', '.db')
+
+
+class Timer:
+    """Collects one result per timed operation."""
+    def __init__(self, size):
+        self.size = size
+        self.results = []
+
+    def time(self, operation, function, calls=1):
+        start = time.perf_counter()
+        value = function()
+        seconds = time.perf_counter() - start
+        self.results.append({
+            'size': self.size,
+            'operation': operation,
+            'calls': calls,
+            'seconds': seconds,
+            'seconds_per_call': seconds / max(calls, 1),
+        })
+        return value
+
+
+def run_size(size, seed=0):
+    """Run every benchmark on a synthetic group of 'size' people."""
+    timer = Timer(size)
+    rng = random.Random(seed)
+    data = workload.generate(size, seed)
+    names = data['names']
+
+    # Person creation, one at a time and in bulk
+    group = Group()
+    timer.time('person_create', lambda: [Person(name, group) for name in names], len(names))
+    group = Group()
+    timer.time('add_people', lambda: group.add_people(names), len(names))
+
+    # Relationships, one at a time for a sample and then in bulk
+    sample = rng.sample(data['edges'], min(SAMPLE, len(data['edges'])))
+    people = group.people
+
+    def add_relationships():
+        for source, target, relationship, directed in sample:
+            if directed:
+                people[source].add_directed_relationship(target, relationship)
+            else:
+                people[source].add_undirected_relationship(target, relationship)
+    timer.time('add_relationship', add_relationships, len(sample))
+    timer.time('add_edges', lambda: group.add_edges(data['edges']), len(data['edges']))
+
+    def set_attributes():
+        for name, attrs in zip(names, data['attributes']):
+            person = people[name]
+            for attr, value in attrs.items():
+                setattr(person, attr, value)
+    timer.time('set_attributes', set_attributes, len(names))
+
+    timer.time('update_relationship_graphs', group.update_relationship_graphs)
+    timer.time('update_relationship_graphs_again', group.update_relationship_graphs)
+
+    # Name search, on fragments of real names
+    queries = [name.split()[0][:rng.randint(3, 6)] for name in rng.sample(names, min(SAMPLE, len(names)))]
+    timer.time('build_name_index', lambda: group.name_index)
+    timer.time('search_names', lambda: [group.search_names(query, limit=50) for query in queries], len(queries))
+    timer.time('search_names_prefix', lambda: [group.search_names(query, limit=50, prefix=True) for query in queries], len(queries))
+
+    # Saving and loading in every file format
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in FORMATS:
+            filename = os.path.join(directory, 'group' + extension)
+            timer.time(f'save{extension}', lambda: group.save_group_to_file(filename))
+            timer.time(f'load{extension}', lambda: load_people_from_file(Group(), filename))
+        filename = os.path.join(directory, 'compact.json')
+        timer.time('save.json_compact', lambda: group.save_group_to_file(filename, indent=None))
+
+    removed = rng.sample(names, min(SAMPLE, len(names)))
+    timer.time('remove_person', lambda: [group.remove_person(name) for name in removed], len(removed))
+    return timer.results
+
+
+def commit():
+    """The git commit the benchmarks ran on, if they ran in a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes=SIZES, seed=0):
+    results = []
+    for size in sizes:
+        results += run_size(size, seed)
+    return {
+        'commit': commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'results': results,
+    }
+
+
+def compare(before, after):
+    """Return the change in seconds per call of every operation timed in both runs, slowest first."""
+    timings = {(result['size'], result['operation']): result['seconds_per_call'] for result in before['results']}
+    changes = []
+    for result in after['results']:
+        key = (result['size'], result['operation'])
+        if key in timings and timings[key] > 0:
+            changes.append({
+                'size': result['size'],
+                'operation': result['operation'],
+                'before': timings[key],
+                'after': result['seconds_per_call'],
+                'ratio': result['seconds_per_call'] / timings[key],
+            })
+    return sorted(changes, key=lambda change: -change['ratio'])
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results to this file instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files')
+    arguments = parser.parse_args(arguments)
+
+    if arguments.compare:
+        with open(arguments.compare[0]) as before, open(arguments.compare[1]) as after:
+            report = compare(json.load(before), json.load(after))
+    else:
+        report = run(arguments.sizes, arguments.seed)
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(report, file, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Synthetic groups for benchmarking: realistic names, relationships and attributes at any size.
+
+A workload has
+    friends      undirected, with power-law degrees drawn from a Pareto distribution and wired
+                 Chung-Lu style, so a few people have very many friends and most have a handful
+    children     directed, from family trees: people are grouped into families of a few
+                 generations, and each person past the first generation has one or two parents
+                 from the generation before
+    partner      undirected and sparse: the two parents of a family are partners
+and every person gets a bio, emails, links and custom attributes of varying size.
+"""
+import numpy as np
+from backend import Group
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen',
+               'Amara', 'Wei', 'Sofia', 'Mateo', 'Aisha', 'Kenji', 'Priya', 'Olumide', 'Ingrid', 'Tariq']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+              'Nguyen', 'Kim', 'Okafor', 'Patel', 'Svensson', 'Tanaka', 'Haddad', 'Kowalski', 'Rossi', 'Dubois']
+WORDS = ['likes', 'trains', 'hiking', 'music', 'chess', 'works', 'at', 'a', 'startup', 'loves', 'coffee', 'and',
+         'reading', 'travels', 'often', 'plays', 'guitar', 'cooks', 'grew', 'up', 'near', 'the', 'sea']
+FRIEND_EXPONENT = 2.5
+MEAN_FRIENDS = 8
+FAMILY_SIZE = 12
+GENERATIONS = 3
+
+
+def _suffix(index):
+    """Spell an index in letters, so every generated name is unique and still a valid name."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('a') + remainder) + letters
+    return letters
+
+
+def names(size, rng):
+    """Return 'size' unique full names; a few have a middle initial."""
+    first = rng.integers(len(FIRST_NAMES), size=size)
+    last = rng.integers(len(LAST_NAMES), size=size)
+    middle = rng.random(size) < 0.2
+    result = []
+    for i in range(size):
+        given = FIRST_NAMES[first[i]] + _suffix(i)
+        initial = f' {chr(ord("A") + i % 26)}.' if middle[i] else ''
+        result.append(f'{given}{initial} {LAST_NAMES[last[i]]}')
+    return result
+
+
+def friend_edges(size, rng, mean=MEAN_FRIENDS, exponent=FRIEND_EXPONENT):
+    """Return (sources, targets) friend pairs whose degrees follow a power law with the given mean."""
+    if size < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    weights = np.minimum(rng.pareto(exponent - 1, size) + 1, np.sqrt(size) * mean)
+    probabilities = weights / weights.sum()
+    count = size * mean // 2
+    sources = rng.choice(size, count, p=probabilities)
+    targets = rng.choice(size, count, p=probabilities)
+    keep = sources != targets
+    return sources[keep], targets[keep]
+
+
+def family_edges(size, rng, family_size=FAMILY_SIZE, generations=GENERATIONS):
+    """Return (parents, children, partners): parent -> child pairs and partner pairs from family trees."""
+    parents, children, partners = [], [], []
+    for start in range(0, size, family_size):
+        members = np.arange(start, min(start + family_size, size))
+        levels = np.array_split(members, generations)
+        for older, younger in zip(levels, levels[1:]):
+            if len(older) == 0:
+                continue
+            if len(older) >= 2:
+                partners.append((older[0], older[1]))
+            for child in younger:
+                mother = older[rng.integers(len(older))]
+                parents.append(mother)
+                children.append(child)
+                if len(older) >= 2 and rng.random() < 0.7:
+                    father = older[0] if mother != older[0] else older[1]
+                    parents.append(father)
+                    children.append(child)
+    return np.array(parents, dtype=np.int64), np.array(children, dtype=np.int64), partners
+
+
+def attributes(index, rng):
+    """Return a rich set of attributes for one person."""
+    words = rng.integers(len(WORDS), size=int(rng.integers(5, 40)))
+    return {
+        'bio': ' '.join(WORDS[word] for word in words),
+        'emails': [f'person{index}.{n}@example.com' for n in range(int(rng.integers(0, 4)))],
+        'links': [f'https://example.com/{index}/{n}' for n in range(int(rng.integers(0, 3)))],
+        'custom_attributes': {f'field{n}': str(int(rng.integers(1000))) for n in range(int(rng.integers(0, 6)))},
+    }
+
+
+def generate(size, seed=0):
+    """Generate a workload as plain data: {'names', 'edges', 'attributes'}.
+
+    'edges' holds (source, target, relationship, directed) tuples as accepted by Group.add_edges.
+    """
+    rng = np.random.default_rng(seed)
+    people = names(size, rng)
+    edges = [(people[a], people[b], 'friends', False) for a, b in zip(*friend_edges(size, rng))]
+    parents, children, partners = family_edges(size, rng)
+    edges += [(people[a], people[b], 'children', True) for a, b in zip(parents, children)]
+    edges += [(people[a], people[b], 'partner', False) for a, b in partners]
+    return {
+        'names': people,
+        'edges': edges,
+        'attributes': [attributes(i, rng) for i in range(size)],
+    }
+
+
+def build_group(workload):
+    """Build a Group holding a generated workload."""
+    group = Group()
+    group.add_people(workload['names'])
+    group.add_edges(workload['edges'])
+    for name, attrs in zip(workload['names'], workload['attributes']):
+        person = group.people[name]
+        for attr, value in attrs.items():
+            setattr(person, attr, value)
+    return group
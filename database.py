@@ -0,0 +1,383 @@
+"""SQLite storage for Group files, so a group can be edited in place without holding it all in memory.
+
+A database file holds the tables
+    relationships   each relationship type and whether it is directed or undirected
+    names           every name the group refers to, with the integer ID the relationship store uses
+    people          the people in the group: a name ID and the parsed first name, middle initial
+                    and last name
+    emails, links   the emails and links of each person, in order
+    attributes      every other attribute of each person, json-encoded, and an empty value marking
+                    emails or links deleted from a person, so they do not read back as empty lists
+    edges           arcs between two name IDs per relationship type, in the order they were added
+    metadata        json-encoded values for the whole group, such as graph layouts
+and is kept in WAL mode, so a save on another connection never blocks readers. Writes are grouped
+into transactions of BATCH_SIZE and committed together.
+"""
+import os
+import json
+import sqlite3
+import itertools
+import threading
+
+DATABASE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+BATCH_SIZE = 10000
+
+# The columns of the people table, and the attributes kept in tables of their own
+NAME_COLUMNS = ('firstname', 'middle', 'lastname')
+LIST_TABLES = {'emails': 'email', 'links': 'link'}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS relationships (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL CHECK (kind IN ('directed', 'undirected'))
+);
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS people (
+    id INTEGER PRIMARY KEY,
+    name INTEGER NOT NULL REFERENCES names (id),
+    firstname TEXT,
+    middle TEXT,
+    lastname TEXT
+);
+CREATE TABLE IF NOT EXISTS emails (
+    person INTEGER NOT NULL REFERENCES people (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (person, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS links (
+    person INTEGER NOT NULL REFERENCES people (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    link TEXT NOT NULL,
+    PRIMARY KEY (person, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS attributes (
+    person INTEGER NOT NULL REFERENCES people (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (person, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS edges (
+    id INTEGER PRIMARY KEY,
+    relationship TEXT NOT NULL,
+    source INTEGER NOT NULL REFERENCES names (id),
+    target INTEGER NOT NULL REFERENCES names (id)
+);
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+'''
+
+# Kept apart from the tables so a bulk import can fill the tables first and index them once
+INDEXES = {
+    'names_by_name': 'CREATE UNIQUE INDEX IF NOT EXISTS names_by_name ON names (name)',
+    'names_nocase': 'CREATE INDEX IF NOT EXISTS names_nocase ON names (name COLLATE NOCASE)',
+    'people_by_name_id': 'CREATE UNIQUE INDEX IF NOT EXISTS people_by_name_id ON people (name)',
+    'people_by_name': 'CREATE INDEX IF NOT EXISTS people_by_name ON people (lastname, firstname)',
+    'emails_by_email': 'CREATE INDEX IF NOT EXISTS emails_by_email ON emails (email)',
+    'edges_by_source': 'CREATE UNIQUE INDEX IF NOT EXISTS edges_by_source ON edges (relationship, source, target)',
+    'edges_by_target': 'CREATE INDEX IF NOT EXISTS edges_by_target ON edges (relationship, target, source)',
+}
+CACHE_KIB = 64 * 1024
+
+PERSON_ID = 'SELECT people.id FROM people JOIN names ON names.id = people.name WHERE names.name = ?'
+
+
+def is_database_file(filename):
+    """Group files ending in .db, .sqlite or .sqlite3 are SQLite databases."""
+    return filename.lower().endswith(DATABASE_EXTENSIONS)
+
+
+def remove_database(filename):
+    """Delete a database file along with any write-ahead log left next to it."""
+    for path in (filename, filename + '-wal', filename + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class Database:
+    """Connection to a group database, with a row-level method for every read and write a Group makes.
+
+    Writes are committed once every 'batch_size' of them (only by commit(), if batch_size is None),
+    so anything written since the last commit is rolled back if the database is closed without one.
+    The connection may be used from any thread, one at a time.
+    """
+    def __init__(self, filename, batch_size=BATCH_SIZE):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.uncommitted = 0
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.execute(f'PRAGMA cache_size = -{CACHE_KIB}')
+        self.connection.executescript(SCHEMA)
+        for index in INDEXES.values():
+            self.connection.execute(index)
+        self.name_count = self._query('SELECT COALESCE(MAX(id) + 1, 0) FROM names')[0][0]
+        self.saved_layouts = self.metadata('layouts', {})
+
+    def is_file(self, filename):
+        """Whether 'filename' is the file this database is kept in."""
+        return os.path.exists(filename) and os.path.samefile(filename, self.filename)
+
+    def _query(self, sql, parameters=()):
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def _write(self, sql, parameters=()):
+        """Run one write, committing the batch it completes; returns the number of rows changed."""
+        with self.lock:
+            changed = self.connection.execute(sql, parameters).rowcount
+            self.uncommitted += 1
+            if self.batch_size is not None and self.uncommitted >= self.batch_size:
+                self.commit()
+            return changed
+
+    def commit(self):
+        with self.lock:
+            self.connection.commit()
+            self.uncommitted = 0
+
+    def close(self):
+        """Close the connection, rolling back anything not yet committed."""
+        with self.lock:
+            self.connection.close()
+
+    def metadata(self, key, default=None):
+        rows = self._query('SELECT value FROM metadata WHERE key = ?', (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set_metadata(self, key, value):
+        self._write('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+
+    @staticmethod
+    def _plain_layouts(layouts):
+        """Return layouts with every position as a list, the way they read back from json."""
+        return {relationship: {name: list(position) for name, position in positions.items()} for relationship, positions in layouts.items()}
+
+    def save_layouts(self, layouts):
+        """Store the graph layouts of the group, unless they are unchanged since they were last stored."""
+        layouts = self._plain_layouts(layouts)
+        if layouts != self.saved_layouts:
+            self.set_metadata('layouts', layouts)
+            self.saved_layouts = layouts
+
+    def relationships(self):
+        return dict(self._query('SELECT name, kind FROM relationships ORDER BY rowid'))
+
+    def set_relationship(self, relationship, kind):
+        self._write('INSERT OR REPLACE INTO relationships (name, kind) VALUES (?, ?)', (relationship, kind))
+
+    def name(self, name_id):
+        """Return the name with an ID, or None if there is none."""
+        rows = self._query('SELECT name FROM names WHERE id = ?', (name_id,))
+        return rows[0][0] if rows else None
+
+    def name_id(self, name):
+        """Return the ID of a name, or None if it has none."""
+        rows = self._query('SELECT id FROM names WHERE name = ?', (name,))
+        return rows[0][0] if rows else None
+
+    def add_name(self, name):
+        """Give a name the next ID and return it."""
+        with self.lock:
+            name_id = self.name_count
+            self._write('INSERT INTO names (id, name) VALUES (?, ?)', (name_id, name))
+            self.name_count += 1
+            return name_id
+
+    def intern(self, name):
+        name_id = self.name_id(name)
+        return self.add_name(name) if name_id is None else name_id
+
+    def has_person(self, fullname):
+        return bool(self._query(PERSON_ID, (fullname,)))
+
+    def person_count(self):
+        return self._query('SELECT COUNT(*) FROM people')[0][0]
+
+    def people(self, reverse=False):
+        """Yield (name ID, name) for each person in the order they were added (or the reverse), reading them a batch at a time."""
+        last = None
+        while True:
+            if reverse:
+                rows = self._query('SELECT people.id, names.id, names.name FROM people JOIN names ON names.id = people.name WHERE people.id < COALESCE(?, 1e18) ORDER BY people.id DESC LIMIT 1000', (last,))
+            else:
+                rows = self._query('SELECT people.id, names.id, names.name FROM people JOIN names ON names.id = people.name WHERE people.id > COALESCE(?, -1) ORDER BY people.id LIMIT 1000', (last,))
+            if not rows:
+                return
+            last = rows[-1][0]
+            for _, name_id, name in rows:
+                yield name_id, name
+
+    def add_person(self, fullname, attributes):
+        """Insert a person and their attributes; the name fields come from the people table, not 'attributes'."""
+        with self.lock:
+            name_id = self.intern(fullname)
+            self._write('INSERT INTO people (name, firstname, middle, lastname) VALUES (?, ?, ?, ?)', (name_id, *(attributes.get(column) for column in NAME_COLUMNS)))
+            for attr, value in attributes.items():
+                if attr not in NAME_COLUMNS and attr != 'fullname':
+                    self.set_attribute(fullname, attr, value)
+            for attr in LIST_TABLES:
+                if attr not in attributes:
+                    self.delete_attribute(fullname, attr)
+
+    def remove_person(self, fullname):
+        """Delete a person and their attributes, keeping their name for any relationships to them; returns False if there was no such person."""
+        return self._write('DELETE FROM people WHERE name = (SELECT id FROM names WHERE name = ?)', (fullname,)) > 0
+
+    def attributes(self, fullname):
+        """Read every attribute of a person back; this makes a Database a lazy attribute source for Person."""
+        with self.lock:
+            person_id, *columns = self._query(f'SELECT people.id, {", ".join(NAME_COLUMNS)} FROM people JOIN names ON names.id = people.name WHERE names.name = ?', (fullname,))[0]
+            attributes = dict(zip(NAME_COLUMNS, columns), fullname=fullname)
+            for attr, column in LIST_TABLES.items():
+                attributes[attr] = [value for value, in self._query(f'SELECT {column} FROM {attr} WHERE person = ? ORDER BY position', (person_id,))]
+            for attr, value in self._query('SELECT name, value FROM attributes WHERE person = ?', (person_id,)):
+                if value:
+                    attributes[attr] = json.loads(value)
+                else:
+                    attributes.pop(attr, None)
+            return attributes
+
+    @staticmethod
+    def _is_list_attribute(attr, value):
+        """Whether an attribute is kept in a table of its own: emails and links, when they are lists of strings."""
+        return attr in LIST_TABLES and isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+    def set_attribute(self, fullname, attr, value):
+        """Store one attribute of a person, touching only the rows that hold it.
+
+        The full name is the person's key, so it is never stored as an attribute.
+        """
+        if attr == 'fullname':
+            return
+        with self.lock:
+            if attr in NAME_COLUMNS:
+                self._write(f'UPDATE people SET {attr} = ? WHERE id = ({PERSON_ID})', (value, fullname))
+                return
+            person_id = self._query(PERSON_ID, (fullname,))[0][0]
+            self._write('DELETE FROM attributes WHERE person = ? AND name = ?', (person_id, attr))
+            if attr in LIST_TABLES:
+                self._write(f'DELETE FROM {attr} WHERE person = ?', (person_id,))
+                if self._is_list_attribute(attr, value):
+                    for position, item in enumerate(value):
+                        self._write(f'INSERT INTO {attr} (person, position, {LIST_TABLES[attr]}) VALUES (?, ?, ?)', (person_id, position, item))
+                    return
+            self._write('INSERT INTO attributes (person, name, value) VALUES (?, ?, ?)', (person_id, attr, json.dumps(value)))
+
+    def delete_attribute(self, fullname, attr):
+        with self.lock:
+            if attr in NAME_COLUMNS:
+                self.set_attribute(fullname, attr, None)
+                return
+            person_id = self._query(PERSON_ID, (fullname,))[0][0]
+            self._write('DELETE FROM attributes WHERE person = ? AND name = ?', (person_id, attr))
+            if attr in LIST_TABLES:
+                self._write(f'DELETE FROM {attr} WHERE person = ?', (person_id,))
+                self._write("INSERT INTO attributes (person, name, value) VALUES (?, ?, '')", (person_id, attr))
+
+    def search_names(self, text, limit=None, prefix=False):
+        """Return the names of people containing 'text', ignoring case, in the order they were added.
+
+        With prefix=True, return the names starting with 'text' in alphabetical order instead.
+        """
+        pattern = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        if prefix:
+            order = 'names.name COLLATE NOCASE, names.name'
+        else:
+            pattern = '%' + pattern
+            order = 'people.id'
+        rows = self._query(f"SELECT names.name FROM people JOIN names ON names.id = people.name WHERE names.name LIKE ? ESCAPE '\\' ORDER BY {order} LIMIT ?", (pattern, -1 if limit is None else limit))
+        return [name for name, in rows]
+
+    def add_edge(self, relationship, source_id, target_id):
+        """Add an arc between two name IDs; returns False if it was already present."""
+        return self._write('INSERT OR IGNORE INTO edges (relationship, source, target) VALUES (?, ?, ?)', (relationship, source_id, target_id)) > 0
+
+    def remove_edge(self, relationship, source_id, target_id):
+        """Remove an arc between two name IDs; returns False if it was not present."""
+        return self._write('DELETE FROM edges WHERE relationship = ? AND source = ? AND target = ?', (relationship, source_id, target_id)) > 0
+
+    def has_edge(self, relationship, source_id, target_id):
+        return bool(self._query('SELECT 1 FROM edges WHERE relationship = ? AND source = ? AND target = ?', (relationship, source_id, target_id)))
+
+    def targets(self, relationship, name_id, reverse=False):
+        """Return the IDs an ID has arcs to, in the order they were added, or has arcs from if reverse=True."""
+        near, far = ('target', 'source') if reverse else ('source', 'target')
+        return [other for other, in self._query(f'SELECT {far} FROM edges WHERE relationship = ? AND {near} = ? ORDER BY id', (relationship, name_id))]
+
+    def degree(self, relationship, name_id):
+        return self._query('SELECT COUNT(*) FROM edges WHERE relationship = ? AND source = ?', (relationship, name_id))[0][0]
+
+    def rows(self, relationship, reverse=False):
+        """Yield (ID, [IDs]) for every ID with arcs of a relationship type, in ID order, with targets in the order they were added."""
+        near, far = ('target', 'source') if reverse else ('source', 'target')
+        arcs = self._query(f'SELECT {near}, {far} FROM edges WHERE relationship = ? ORDER BY {near}, id', (relationship,))
+        for name_id, group in itertools.groupby(arcs, key=lambda arc: arc[0]):
+            yield name_id, [other for _, other in group]
+
+    def import_group(self, relationships, records, layouts=None):
+        """Write a whole group into an empty database in one transaction, BATCH_SIZE people at a time.
+
+        Records are the dicts Group._record_builder returns: the attributes of a person, with a list
+        of target names under each relationship type they have. The import stays in WAL mode, so if
+        it fails or the process dies part way the database is left as empty as it was.
+        """
+        assert not self.name_count, f'Database "{self.filename}" is not empty.'
+        records = iter(records)
+        ids = dict()
+        person_id = 0
+        with self.lock:
+            connection = self.connection
+            connection.execute('BEGIN')
+            try:
+                for index in INDEXES:
+                    connection.execute(f'DROP INDEX {index}')
+                for relationship, kind in relationships.items():
+                    connection.execute('INSERT OR REPLACE INTO relationships (name, kind) VALUES (?, ?)', (relationship, kind))
+                for chunk in iter(lambda: list(itertools.islice(records, BATCH_SIZE)), []):
+                    names, people, attributes, edges = [], [], [], []
+                    lists = {attr: [] for attr in LIST_TABLES}
+
+                    def intern(name):
+                        if name not in ids:
+                            ids[name] = len(ids)
+                            names.append((ids[name], name))
+                        return ids[name]
+
+                    for record in chunk:
+                        person_id += 1
+                        people.append((person_id, intern(record['fullname']), *(record.get(column) for column in NAME_COLUMNS)))
+                        attributes.extend((person_id, attr, '') for attr in LIST_TABLES if attr not in record)
+                        for attr, value in record.items():
+                            if attr in relationships:
+                                edges.extend((attr, ids[record['fullname']], intern(target)) for target in value)
+                            elif attr not in NAME_COLUMNS and attr != 'fullname':
+                                if self._is_list_attribute(attr, value):
+                                    lists[attr].extend((person_id, position, item) for position, item in enumerate(value))
+                                else:
+                                    attributes.append((person_id, attr, json.dumps(value)))
+
+                    connection.executemany('INSERT INTO names (id, name) VALUES (?, ?)', names)
+                    connection.executemany('INSERT INTO people (id, name, firstname, middle, lastname) VALUES (?, ?, ?, ?, ?)', people)
+                    for attr, rows in lists.items():
+                        connection.executemany(f'INSERT INTO {attr} (person, position, {LIST_TABLES[attr]}) VALUES (?, ?, ?)', rows)
+                    connection.executemany('INSERT INTO attributes (person, name, value) VALUES (?, ?, ?)', attributes)
+                    connection.executemany('INSERT INTO edges (relationship, source, target) VALUES (?, ?, ?)', edges)
+                for index in INDEXES.values():
+                    connection.execute(index)
+                layouts = self._plain_layouts(layouts or {})
+                connection.execute('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', ('layouts', json.dumps(layouts)))
+            except BaseException:
+                connection.rollback()
+                raise
+            self.commit()
+            self.name_count = len(ids)
+            self.saved_layouts = layouts
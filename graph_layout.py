@@ -0,0 +1,172 @@
+"""Force-directed layouts for relationship graphs, computed with NumPy.
+
+Layouts follow the Fruchterman-Reingold model used by networkx.spring_layout: every pair of people
+repel each other, related people attract, and each step is capped by a temperature that cools over
+the iterations. Repulsion is computed exactly for small graphs. Above BARNES_HUT_THRESHOLD people
+it is approximated Barnes-Hut style with a quadtree: each person interacts directly only with the
+centre of mass of nearby cells, and with coarser cells the further away they are, so one iteration
+costs O(N log N) instead of O(N^2).
+"""
+import numpy as np
+
+BARNES_HUT_THRESHOLD = 1000
+COLD_ITERATIONS = 50
+WARM_ITERATIONS = 10
+PROGRESS_EVERY = 5
+MIN_DISTANCE = 0.01
+REPULSION_BLOCK = 2 ** 14
+
+
+def _exact_repulsion(positions, k2):
+    """Sum the repulsion on each node from every other node."""
+    delta = positions[:, None, :] - positions[None, :, :]
+    distance2 = np.maximum((delta ** 2).sum(axis=2), MIN_DISTANCE ** 2)
+    return (delta * (k2 / distance2)[:, :, None]).sum(axis=1)
+
+
+def _cell_repulsion(points, cells, flat, mass, center, side, k2, finest):
+    """Sum the repulsion on each point from the cells in its interaction list at one quadtree level.
+
+    The interaction list holds the children of the neighbours of the point's parent cell, leaving
+    out the neighbours of its own cell unless this is the finest level; there, the point's own cell
+    counts without the point itself. Points are processed in blocks to bound memory.
+    """
+    offsets = np.arange(-2, 4)
+    force = np.zeros_like(points)
+    for block in range(0, len(points), REPULSION_BLOCK):
+        rows = slice(block, block + REPULSION_BLOCK)
+        own = cells[rows]
+        x = (2 * (own[:, 0] // 2))[:, None, None] + offsets[None, :, None]
+        y = (2 * (own[:, 1] // 2))[:, None, None] + offsets[None, None, :]
+        use = (x >= 0) & (x < side) & (y >= 0) & (y < side)
+        if not finest:
+            use &= (np.abs(x - own[:, 0, None, None]) > 1) | (np.abs(y - own[:, 1, None, None]) > 1)
+        cell = np.where(use, x * side + y, 0).reshape(len(own), -1)
+        weight = mass[cell] * use.reshape(len(own), -1)
+        delta = points[rows, None, :] - center[cell]
+        if finest:
+            # A point's own cell without the point has its centre of mass mass / (mass - 1) times as far away
+            mine = (cell == flat[rows, None]) & (weight > 0)
+            delta *= np.where(mine, weight / np.maximum(weight - 1, 1), 1.0)[:, :, None]
+            weight = weight - mine
+        distance2 = np.maximum((delta ** 2).sum(axis=2), MIN_DISTANCE ** 2)
+        force[rows] = (delta * (k2 * weight / distance2)[:, :, None]).sum(axis=1)
+    return force
+
+
+def _approximate_repulsion(positions, k2):
+    """Approximate the repulsion on each node with a quadtree over the current positions.
+
+    Each cell of the tree acts as a single node of its total mass at its centre of mass. At every
+    level a node feels the cells that are children of its parent's neighbours but not neighbours of
+    its own cell, which are left to the next level down; at the finest level, whose cells hold about
+    one node each, it also feels its neighbouring cells and the rest of its own cell. Above the two
+    finest levels, the far cells are felt once per occupied cell rather than once per node.
+    """
+    count = len(positions)
+    low = positions.min(axis=0)
+    extent = max(float((positions.max(axis=0) - low).max()), MIN_DISTANCE)
+    unit = (positions - low) / (extent * (1 + 1e-9))
+    depth = int(np.clip(np.ceil(np.log(count) / np.log(4)), 2, 12))
+    force = np.zeros_like(positions)
+    for level in range(2, depth + 1):
+        side = 2 ** level
+        cells = np.minimum((unit * side).astype(np.int64), side - 1)
+        flat = cells[:, 0] * side + cells[:, 1]
+        mass = np.bincount(flat, minlength=side * side).astype(float)
+        center = np.stack([
+            np.bincount(flat, weights=positions[:, axis], minlength=side * side)
+            for axis in (0, 1)
+        ], axis=1) / np.maximum(mass, 1)[:, None]
+        if level >= depth - 1:
+            force += _cell_repulsion(positions, cells, flat, mass, center, side, k2, level == depth)
+        else:
+            occupied = np.flatnonzero(mass)
+            occupied_cells = np.stack([occupied // side, occupied % side], axis=1)
+            cell_force = np.zeros((side * side, 2))
+            cell_force[occupied] = _cell_repulsion(center[occupied], occupied_cells, occupied, mass, center, side, k2, False)
+            force += cell_force[flat]
+    return force
+
+
+def force_layout(count, sources, targets, positions=None, iterations=COLD_ITERATIONS, temperature=0.1, seed=None, progress=None):
+    """Lay out 'count' nodes joined by the edges (sources[i], targets[i]), returning a (count, 2) array.
+
+    Starts from 'positions' if given, otherwise from random positions in the unit square. If given,
+    progress(positions) is called every PROGRESS_EVERY iterations, and stops the layout early by
+    returning False.
+    """
+    rng = np.random.default_rng(seed)
+    if positions is None:
+        positions = rng.random((count, 2))
+    positions = np.array(positions, dtype=float)
+    if count < 2:
+        return positions
+    k2 = 1.0 / count
+    k = np.sqrt(k2)
+    repulsion = _exact_repulsion if count <= BARNES_HUT_THRESHOLD else _approximate_repulsion
+    cooling = temperature / (iterations + 1)
+    for iteration in range(iterations):
+        displacement = repulsion(positions, k2)
+        delta = positions[sources] - positions[targets]
+        distance = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), MIN_DISTANCE)
+        pull = delta * (distance / k)[:, None]
+        for axis in (0, 1):
+            displacement[:, axis] += np.bincount(targets, weights=pull[:, axis], minlength=count)
+            displacement[:, axis] -= np.bincount(sources, weights=pull[:, axis], minlength=count)
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), MIN_DISTANCE)
+        positions += displacement * (temperature / length)[:, None]
+        temperature -= cooling
+        if progress and (iteration + 1) % PROGRESS_EVERY == 0 and progress(positions.copy()) is False:
+            break
+    return positions
+
+
+def update_layout(names, sources, targets, previous, iterations=None, seed=None, progress=None):
+    """Lay out the graph over 'names' with edges (sources[i], targets[i]), starting from 'previous' positions by name.
+
+    If at least half of the nodes already have a position, the rest are placed beside their
+    neighbours and the layout is warm-started for WARM_ITERATIONS at a low temperature, so it
+    barely moves; otherwise it is laid out from scratch for COLD_ITERATIONS. Returns the positions
+    as a (len(names), 2) array.
+    """
+    count = len(names)
+    placed = np.array([name in previous for name in names], dtype=bool)
+    start = np.array([previous.get(name, (0.0, 0.0)) for name in names], dtype=float).reshape(count, 2)
+    if placed.sum() * 2 >= count and placed.any():
+        start = place_new_nodes(start, placed, sources, targets, seed)
+        temperature = 0.25 / np.sqrt(max(count, 1))
+        iterations = WARM_ITERATIONS if iterations is None else iterations
+    else:
+        start = None
+        temperature = 0.1
+        iterations = COLD_ITERATIONS if iterations is None else iterations
+    return force_layout(count, sources, targets, start, iterations, temperature, seed, progress)
+
+
+def place_new_nodes(positions, placed, sources, targets, seed=None):
+    """Fill in the rows of 'positions' that are not 'placed', next to their placed neighbours if they have any.
+
+    Nodes without a placed neighbour are scattered over the area the placed nodes already cover.
+    """
+    rng = np.random.default_rng(seed)
+    count = len(positions)
+    k = np.sqrt(1.0 / max(count, 1))
+    known = np.where(placed[:, None], positions, 0.0)
+    neighbors = np.zeros(count)
+    totals = np.zeros((count, 2))
+    for near, far in ((sources, targets), (targets, sources)):
+        neighbors += np.bincount(near, weights=placed[far].astype(float), minlength=count)
+        for axis in (0, 1):
+            totals[:, axis] += np.bincount(near, weights=known[far, axis], minlength=count)
+
+    new = ~placed
+    beside = new & (neighbors > 0)
+    positions[beside] = totals[beside] / neighbors[beside, None] + rng.normal(0, k / 4, (beside.sum(), 2))
+    alone = new & (neighbors == 0)
+    if placed.any():
+        low, high = positions[placed].min(axis=0), positions[placed].max(axis=0)
+    else:
+        low, high = np.zeros(2), np.ones(2)
+    positions[alone] = low + rng.random((alone.sum(), 2)) * np.maximum(high - low, k)
+    return positions
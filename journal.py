@@ -0,0 +1,89 @@
+"""Append-only mutation journal kept next to a group file.
+
+Each line of a journal is one json-encoded mutation record. Records are flushed to the operating
+system as they are appended and fsynced in batches, so a crash loses at most the last unsynced batch
+and never corrupts the base group file.
+"""
+import os
+import json
+
+JOURNAL_SUFFIX = '.journal'
+
+
+def journal_path(filename):
+    """Return the path of the journal kept next to a group file."""
+    return filename + JOURNAL_SUFFIX
+
+
+def read_journal(path, end=None):
+    """Yield the records in a journal, up to byte 'end' if given, stopping at a torn final line left by a crash."""
+    with open(path, 'rb') as file:
+        offset = 0
+        for line in file:
+            offset += len(line)
+            if not line.endswith(b'\n') or (end is not None and offset > end):
+                return
+            yield json.loads(line)
+
+
+class Journal:
+    """Appends mutation records to a journal file, fsyncing once every 'sync_every' records."""
+    def __init__(self, path, sync_every=64):
+        self.path = path
+        self.sync_every = sync_every
+        self.unsynced = 0
+        self.file = open(path, 'a', encoding='utf-8')
+
+    @property
+    def size(self):
+        """Size of the journal in bytes."""
+        return self.file.tell()
+
+    def append(self, record):
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        """Force every appended record to disk."""
+        if self.unsynced:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+
+    def mark(self):
+        """Return a position that the journal can later be rolled back to."""
+        return self.size
+
+    def rollback(self, mark=0):
+        """Discard every record appended after 'mark'; the default discards the whole journal."""
+        mark = min(mark, self.size)
+        self.file.truncate(mark)
+        self.file.seek(mark)
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def discard_before(self, mark):
+        """Drop the records before 'mark', once they have been folded into the group file.
+
+        The records after 'mark' are written to a new file that is renamed over the journal, so a
+        crash leaves either the old journal or the new one, never a partial one.
+        """
+        self.file.flush()
+        with open(self.path, 'rb') as file:
+            file.seek(mark)
+            tail = file.read()
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(tail)
+            file.flush()
+            os.fsync(file.fileno())
+        self.file.close()
+        os.replace(temporary, self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.unsynced = 0
+
+    def close(self):
+        self.sync()
+        self.file.close()
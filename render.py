@@ -0,0 +1,165 @@
+"""Level-of-detail rendering of relationship graphs with matplotlib, without needing a display.
+
+Graphs of up to MAX_NODES people are drawn in full. Larger graphs are simplified first, either by
+binning people into a density grid or by collapsing communities of COMMUNITY_SIZE people or more
+into a single node. Labels are only drawn for the LABELS best-connected nodes. Everything is drawn
+with one collection per layer rather than one artist per node or edge, so drawing stays fast.
+"""
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.colors import LogNorm
+
+MAX_NODES = 2000
+LABELS = 20
+BINS = 64
+COMMUNITY_SIZE = 50
+MAX_EDGES = 5000
+NODE_COLOR = 'skyblue'
+EDGE_COLOR = 'grey'
+
+
+def label_propagation(count, sources, targets, iterations=20):
+    """Group nodes into communities by synchronous label propagation; returns a community label per node.
+
+    Every node takes the label that is most common among itself and its neighbours, breaking ties
+    towards the smaller label, until nothing changes or 'iterations' rounds have run.
+    """
+    labels = np.arange(count)
+    voters = np.concatenate([sources, targets, np.arange(count)])
+    for _ in range(iterations):
+        votes = np.concatenate([labels[targets], labels[sources], labels])
+        pairs, counts = np.unique(voters * count + votes, return_counts=True)
+        nodes, candidates = pairs // count, pairs % count
+        order = np.lexsort((candidates, -counts, nodes))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = nodes[order][1:] != nodes[order][:-1]
+        updated = np.empty(count, dtype=np.int64)
+        updated[nodes[order][first]] = candidates[order][first]
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    return labels
+
+
+def _aggregate(groups, sources, targets, limit):
+    """Merge edges between the same two groups, returning the (first, second, count) of the 'limit' heaviest."""
+    first, second = np.minimum(groups[sources], groups[targets]), np.maximum(groups[sources], groups[targets])
+    between = first != second
+    size = int(groups.max()) + 1 if len(groups) else 1
+    pairs, counts = np.unique(first[between] * size + second[between], return_counts=True)
+    heaviest = np.argsort(-counts, kind='stable')[:limit]
+    return pairs[heaviest] // size, pairs[heaviest] % size, counts[heaviest]
+
+
+def _edge_widths(counts):
+    return 0.3 + np.log1p(counts) / np.log1p(max(counts.max(), 1))
+
+
+def _draw_labels(ax, points, texts, weights, labels):
+    """Label the 'labels' points with the largest weights."""
+    for i in np.argsort(-weights, kind='stable')[:labels]:
+        ax.annotate(texts[i], points[i], fontsize=8, ha='center', va='bottom')
+
+
+def _draw_full(ax, names, positions, sources, targets, degree, labels):
+    ax.add_collection(LineCollection(np.stack([positions[sources], positions[targets]], axis=1)[:MAX_EDGES], colors=EDGE_COLOR, linewidths=0.5, alpha=0.6, zorder=1))
+    ax.scatter(positions[:, 0], positions[:, 1], s=10 + 40 * degree / max(degree.max(), 1), c=NODE_COLOR, edgecolors='none', zorder=2)
+    _draw_labels(ax, positions, names, degree, labels)
+    return positions, [[name] for name in names]
+
+
+def _draw_bins(ax, names, positions, sources, targets, degree, labels, bins):
+    low, high = positions.min(axis=0), positions.max(axis=0)
+    high = np.maximum(high, low + 1e-9)
+    cells = np.minimum(((positions - low) / (high - low) * bins).astype(np.int64), bins - 1)
+    cell = cells[:, 0] * bins + cells[:, 1]
+    density = np.bincount(cell, minlength=bins * bins).reshape(bins, bins)
+    ax.imshow(np.ma.masked_equal(density.T, 0), origin='lower', extent=(low[0], high[0], low[1], high[1]), cmap='Blues', norm=LogNorm(vmin=1, vmax=max(density.max(), 2)), aspect='auto', zorder=0)
+
+    # Edges between bins are drawn once per pair of bins, between their centres of mass
+    centers = np.stack([np.bincount(cell, weights=positions[:, axis], minlength=bins * bins) for axis in (0, 1)], axis=1)
+    centers /= np.maximum(density.reshape(-1), 1)[:, None]
+    first, second, counts = _aggregate(cell, sources, targets, MAX_EDGES)
+    ax.add_collection(LineCollection(np.stack([centers[first], centers[second]], axis=1), colors=EDGE_COLOR, linewidths=_edge_widths(counts) if len(counts) else 1, alpha=0.4, zorder=1))
+
+    top = np.argsort(-degree, kind='stable')[:labels]
+    ax.scatter(positions[top, 0], positions[top, 1], s=12, c='black', zorder=2)
+    _draw_labels(ax, positions[top], [names[i] for i in top], degree[top], labels)
+    members = [[] for _ in range(bins * bins)]
+    for i, name in enumerate(names):
+        members[cell[i]].append(name)
+    occupied = np.flatnonzero(density.reshape(-1))
+    return centers[occupied], [members[i] for i in occupied]
+
+
+def _draw_communities(ax, names, positions, sources, targets, degree, labels, community_size):
+    communities = label_propagation(len(names), sources, targets)
+    sizes = np.bincount(communities, minlength=len(names))
+    collapsed = sizes[communities] >= community_size
+
+    # Every person outside a large community is a node of their own; each large community is one node
+    large = np.flatnonzero(sizes >= community_size)
+    node_of = np.where(collapsed, np.searchsorted(large, communities), len(large) + np.cumsum(~collapsed) - 1)
+    node_count = len(large) + int((~collapsed).sum())
+    weight = np.bincount(node_of, minlength=node_count)
+    points = np.stack([np.bincount(node_of, weights=positions[:, axis], minlength=node_count) for axis in (0, 1)], axis=1) / weight[:, None]
+    node_degree = np.bincount(node_of, weights=degree, minlength=node_count)
+
+    first, second, counts = _aggregate(node_of, sources, targets, MAX_EDGES)
+    ax.add_collection(LineCollection(np.stack([points[first], points[second]], axis=1), colors=EDGE_COLOR, linewidths=_edge_widths(counts) if len(counts) else 1, alpha=0.5, zorder=1))
+    ax.scatter(points[:, 0], points[:, 1], s=10 + 200 * np.sqrt(weight / weight.max()), c=np.where(weight > 1, 'steelblue', NODE_COLOR), edgecolors='none', zorder=2)
+
+    # Collapsed communities are named after their best-connected member
+    members = [[] for _ in range(node_count)]
+    for i in np.argsort(-degree, kind='stable'):
+        members[node_of[i]].append(names[i])
+    texts = [group[0] if len(group) == 1 else f'{group[0]} +{len(group) - 1}' for group in members]
+    _draw_labels(ax, points, texts, node_degree, labels)
+    return points, members
+
+
+def draw_graph(ax, names, positions, sources, targets, title, mode='bins', max_nodes=MAX_NODES, labels=LABELS, bins=BINS, community_size=COMMUNITY_SIZE):
+    """Draw the graph over 'names' at 'positions', with edges (sources[i], targets[i]), onto a matplotlib Axes.
+
+    Graphs of more than 'max_nodes' people are drawn as a 'bins' density grid or with large
+    'communities' collapsed. Returns (points, members): the position of each drawn node and the
+    names of the people it stands for, for example to find who was clicked on.
+    """
+    assert mode in ('bins', 'communities'), f'Unknown rendering mode "{mode}".'
+    degree = np.bincount(np.concatenate([sources, targets]), minlength=len(names)).astype(float)
+    ax.set_title(title)
+    ax.set_axis_off()
+    if len(names) == 0:
+        return positions, []
+    if len(names) <= max_nodes:
+        drawn = _draw_full(ax, names, positions, sources, targets, degree, labels)
+    elif mode == 'bins':
+        drawn = _draw_bins(ax, names, positions, sources, targets, degree, labels, bins)
+    else:
+        drawn = _draw_communities(ax, names, positions, sources, targets, degree, labels, community_size)
+    ax.autoscale_view()
+    return drawn
+
+
+def draw_relationship_graph(ax, group, relationship, **options):
+    """Draw a relationship graph of a Group onto a matplotlib Axes, simplifying it if it is large.
+
+    Options are passed on to draw_graph, which also describes the return value.
+    """
+    layout = group.relationship_layout(relationship)
+    names, sources, targets = group.edge_arrays(relationship)
+    positions = np.array([layout[name] for name in names], dtype=float).reshape(len(names), 2)
+    return draw_graph(ax, names, positions, sources, targets, f"{relationship.capitalize()} Relationship Graph", **options)
+
+
+def render_relationship_graph(group, relationship, filename, figsize=(8, 6), dpi=150, **options):
+    """Render a relationship graph of a Group to an image file, such as a .png or .svg, without a display.
+
+    Options are passed on to draw_relationship_graph.
+    """
+    figure = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(figure)
+    draw_relationship_graph(figure.add_subplot(), group, relationship, **options)
+    figure.savefig(filename)
@@ -0,0 +1,135 @@
+"""Memory-mapped binary snapshot format for Group files.
+
+A snapshot is laid out as follows, in native byte order with every section 8-byte aligned:
+    magic         8 bytes, b'SNGROUP1'
+    header size   uint64
+    header        json holding the relationships, the name and person counts, the byte order,
+                  any saved graph layouts and the (offset, length) of every section below
+    names         string table: uint64 offsets[names + 1], then the utf-8 names
+    attributes    uint64 offsets[people + 1], then one json object of attributes per person
+    adjacency     for each relationship type, CSR arrays: uint64 indptr[people + 1] and
+                  uint32 indices[edges] pointing into the string table
+
+The first 'people' names in the string table are the people in the group; any after them are
+names that only appear as the target of a relationship.
+"""
+import os
+import sys
+import json
+import mmap
+from array import array
+
+MAGIC = b'SNGROUP1'
+SNAPSHOT_EXTENSIONS = ('.snap',)
+
+
+def is_snapshot_file(filename):
+    """Group files ending in .snap use the binary snapshot format."""
+    return filename.lower().endswith(SNAPSHOT_EXTENSIONS)
+
+
+def _string_table(strings):
+    """Encode a sequence of byte strings as an offsets array and a blob."""
+    offsets = array('Q', [0])
+    for string in strings:
+        offsets.append(offsets[-1] + len(string))
+    return offsets, b''.join(strings)
+
+
+def write_snapshot(filename, relationships, names, person_count, attributes, adjacency, layouts=None):
+    """Write a snapshot file.
+
+    'names' is the string table, the first 'person_count' of which are people, 'attributes' holds the
+    json-encoded attributes of each person, and 'adjacency' maps each relationship type to a list of
+    target name indices per person. Any 'layouts' (relationship type to {name: position}) are kept in
+    the header. The file is written next to 'filename' and renamed into place,
+    so a snapshot that is currently mapped is never modified.
+    """
+    sections = []
+    offsets, blob = _string_table([name.encode('utf-8') for name in names])
+    sections += [('names.offsets', offsets), ('names.data', blob)]
+    offsets, blob = _string_table(attributes)
+    sections += [('attributes.offsets', offsets), ('attributes.data', blob)]
+    for relationship in relationships:
+        rows = adjacency.get(relationship, [])
+        indptr = array('Q', [0])
+        indices = array('I')
+        for person_index in range(person_count):
+            row = rows[person_index] if person_index < len(rows) else ()
+            indices.extend(row)
+            indptr.append(len(indices))
+        sections += [(f'{relationship}.indptr', indptr), (f'{relationship}.indices', indices)]
+
+    # Lay out the sections after the header, padding each to an 8-byte boundary
+    layout = dict()
+    position = 0
+    for key, data in sections:
+        size = len(data) * data.itemsize if isinstance(data, array) else len(data)
+        layout[key] = (position, size)
+        position += size + (-size % 8)
+    header = json.dumps({
+        'relationships': relationships,
+        'names': len(names),
+        'people': person_count,
+        'byteorder': sys.byteorder,
+        'sections': layout,
+        'layouts': layouts or {},
+    }).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 8 + len(header)) % 8)
+    base = len(MAGIC) + 8 + len(header)
+
+    temporary = filename + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(MAGIC)
+        file.write(array('Q', [len(header)]).tobytes())
+        file.write(header)
+        for key, data in sections:
+            offset, size = layout[key]
+            file.seek(base + offset)
+            file.write(data)
+        file.truncate(base + position)
+    os.replace(temporary, filename)
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file; nothing is decoded until it is asked for."""
+    def __init__(self, filename):
+        with open(filename, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        assert self.map[:len(MAGIC)] == MAGIC, f'File "{filename}" is not a group snapshot.'
+        header_size = memoryview(self.map)[len(MAGIC):len(MAGIC) + 8].cast('Q')[0]
+        header_start = len(MAGIC) + 8
+        header = json.loads(self.map[header_start:header_start + header_size])
+        assert header['byteorder'] == sys.byteorder, f'Snapshot "{filename}" was written on a {header["byteorder"]}-endian machine.'
+        self.relationships = header['relationships']
+        self.name_count = header['names']
+        self.person_count = header['people']
+        self.base = header_start + header_size
+        self.sections = header['sections']
+        self.layouts = header.get('layouts', {})
+        self.name_offsets = self._section('names.offsets', 'Q')
+        self.attribute_offsets = self._section('attributes.offsets', 'Q')
+
+    def _section(self, key, fmt=None):
+        offset, size = self.sections[key]
+        view = memoryview(self.map)[self.base + offset:self.base + offset + size]
+        return view.cast(fmt) if fmt else view
+
+    def names(self):
+        """Decode the whole string table."""
+        data = self._section('names.data')
+        offsets = self.name_offsets
+        return [str(data[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(self.name_count)]
+
+    def attribute_bytes(self, index):
+        """Return the raw json-encoded attributes of the person at 'index'."""
+        start, end = self.attribute_offsets[index], self.attribute_offsets[index + 1]
+        return bytes(self._section('attributes.data')[start:end])
+
+    def attributes(self, index):
+        """Decode the attributes of the person at 'index'."""
+        return json.loads(self.attribute_bytes(index))
+
+    def csr(self, relationship):
+        """Return the (indptr, indices) arrays of a relationship type as memoryviews onto the file."""
+        return self._section(f'{relationship}.indptr', 'Q'), self._section(f'{relationship}.indices', 'I')
@@ -0,0 +1,76 @@
+"""Check the vectorized analytics against networkx on small random groups."""
+import random
+
+import numpy as np
+import networkx as nx
+import pytest
+
+import analytics
+from backend import Group
+
+SEEDS = range(20)
+
+
+def random_group(seed):
+    """Return a random group with directed 'follows' and undirected 'friends' arcs, and the same arcs as a DiGraph."""
+    rng = random.Random(seed)
+    names = [f'Person{i} Test' for i in range(rng.randint(2, 25))]
+    group = Group()
+    group.add_people(names)
+    graph = nx.DiGraph()
+    graph.add_nodes_from(names)
+    edges = []
+    for _ in range(rng.randint(0, 3 * len(names))):
+        source, target = rng.sample(names, 2)
+        directed = rng.random() < 0.5
+        edges.append((source, target, 'follows' if directed else 'friends', directed))
+        graph.add_edge(source, target)
+        if not directed:
+            graph.add_edge(target, source)
+    assert group.add_edges(edges) == []
+    return group, graph
+
+
+def reference_pagerank(graph, alpha=0.85):
+    """PageRank as the principal eigenvector of the networkx Google matrix, which needs no scipy."""
+    nodes = list(graph)
+    values, vectors = np.linalg.eig(nx.google_matrix(graph, alpha, nodelist=nodes).T)
+    vector = np.real(vectors[:, np.argmax(np.real(values))])
+    return dict(zip(nodes, vector / vector.sum()))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_degrees(seed):
+    group, graph = random_group(seed)
+    assert analytics.degrees(group, direction='out') == dict(graph.out_degree())
+    assert analytics.degrees(group, direction='in') == dict(graph.in_degree())
+    assert analytics.degrees(group, direction='total') == dict(graph.degree())
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_pagerank(seed):
+    group, graph = random_group(seed)
+    ranks, expected = analytics.pagerank(group, tol=1.0e-10, max_iter=1000), reference_pagerank(graph)
+    assert ranks.keys() == expected.keys()
+    for name, rank in ranks.items():
+        assert rank == pytest.approx(expected[name], abs=1.0e-6)
+
+
+def test_pagerank_not_converging():
+    group, _ = random_group(3)
+    with pytest.raises(nx.PowerIterationFailedConvergence):
+        analytics.pagerank(group, max_iter=1, tol=0)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_triangles(seed):
+    group, graph = random_group(seed)
+    assert analytics.triangles(group) == nx.triangles(graph.to_undirected())
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_clustering(seed):
+    group, graph = random_group(seed)
+    expected = nx.clustering(graph.to_undirected())
+    for name, coefficient in analytics.clustering(group).items():
+        assert coefficient == pytest.approx(expected[name])
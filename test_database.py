@@ -0,0 +1,127 @@
+"""Check that a group kept in a SQLite database behaves like the same group kept in memory."""
+import gc
+import random
+
+import pytest
+
+import backend
+import database
+from backend import Group
+from test_journal import random_edits
+from test_storage import assert_same_group, path, random_group, records
+
+SEEDS = range(10)
+
+
+@pytest.fixture
+def open_groups():
+    """Collect the database groups a test opens and close them afterwards."""
+    groups = []
+    yield groups
+    for group in groups:
+        group.database.close()
+
+
+def open_database(open_groups, filename):
+    group = Group(filename)
+    open_groups.append(group)
+    return group
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_round_trip(path, open_groups, seed):
+    group = random_group(seed)
+    group.save_group_to_file(path('group.db'))
+    loaded = open_database(open_groups, path('group.db'))
+    assert loaded.database is not None
+    assert_same_group(loaded, group)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_edits_match_memory(path, open_groups, seed):
+    """The same edits made to a group in memory and to one kept in a database leave the same group."""
+    group = random_group(seed)
+    group.save_group_to_file(path('group.db'))
+    kept = open_database(open_groups, path('group.db'))
+    random_edits(group, random.Random(seed))
+    random_edits(kept, random.Random(seed))
+    assert records(kept) == records(group)
+    kept.save_group_to_file(path('group.db'))
+    assert_same_group(open_database(open_groups, path('group.db')), group)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_search_names_matches_memory(path, open_groups, seed):
+    group = random_group(seed)
+    group.save_group_to_file(path('group.db'))
+    kept = open_database(open_groups, path('group.db'))
+    for text in ('', 'person1', 'SON2', ' t', 'x'):
+        assert kept.search_names(text) == group.search_names(text)
+        assert kept.search_names(text, limit=3, prefix=True) == group.search_names(text, limit=3, prefix=True)
+
+
+def test_in_place_edits_are_committed(path, open_groups):
+    """Lists and dicts edited in place are written back on save, even with no reference left to the person."""
+    group = Group()
+    group.add_people(['Ann Lee'])
+    group.people['Ann Lee'].info = {'a': 1}
+    group.save_group_to_file(path('group.db'))
+    kept = open_database(open_groups, path('group.db'))
+    kept.people['Ann Lee'].emails.append('ann@example.com')
+    gc.collect()
+    kept.people['Ann Lee'].info['b'] = 2
+    kept.add_people(['Bob Ray'])
+    kept.people['Bob Ray'].links.append('https://example.com')
+    gc.collect()
+    kept.save_group_to_file(path('group.db'))
+    reopened = open_database(open_groups, path('group.db'))
+    assert reopened.people['Ann Lee'].emails == ['ann@example.com']
+    assert reopened.people['Ann Lee'].info == {'a': 1, 'b': 2}
+    assert reopened.people['Bob Ray'].links == ['https://example.com']
+
+
+@pytest.mark.parametrize('filename', ['group.snap', 'group.db'])
+def test_deleted_lists_stay_deleted(path, open_groups, filename):
+    group = Group()
+    group.add_people(['Ann Lee', 'Bob Ray'])
+    del group.people['Ann Lee'].emails
+    group.save_group_to_file(path(filename))
+    loaded = Group(path(filename))
+    if loaded.database:
+        open_groups.append(loaded)
+        del loaded.people['Bob Ray'].links
+        loaded.save_group_to_file(path(filename))
+        loaded = open_database(open_groups, path(filename))
+        assert not hasattr(loaded.people['Bob Ray'], 'links')
+    assert not hasattr(loaded.people['Ann Lee'], 'emails')
+    assert loaded.people['Ann Lee'].links == []
+
+
+def test_uncommitted_edits_roll_back(path, open_groups):
+    random_group(0).save_group_to_file(path('group.db'))
+    kept = Group(path('group.db'))
+    expected = records(kept)
+    kept.database.batch_size = None
+    kept.add_people(['Ann Lee'])
+    kept.people['Person0 Test'].bio = 'Changed'
+    kept.database.close()
+    assert records(open_database(open_groups, path('group.db'))) == expected
+
+
+def test_failed_import_leaves_nothing(path):
+    def failing_records():
+        yield {'fullname': 'Ann Lee', 'firstname': 'Ann', 'middle': None, 'lastname': 'Lee', 'emails': [], 'links': []}
+        raise RuntimeError('Import failed')
+    source = database.Database(path('group.db'))
+    with pytest.raises(RuntimeError):
+        source.import_group({'friends': 'undirected'}, failing_records())
+    assert source.person_count() == 0 and source.relationships() == {}
+    source.close()
+
+
+@pytest.mark.parametrize('destination', ['group.json', 'group.ndjson', 'group.snap'])
+def test_convert_from_database(path, destination):
+    group = random_group(3)
+    group.save_group_to_file(path('group.db'))
+    backend.convert_group_file(path('group.db'), path(destination))
+    assert_same_group(Group(path(destination)), group)
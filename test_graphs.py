@@ -0,0 +1,131 @@
+"""Check the incrementally kept relationship graphs and path queries against full rebuilds and networkx under random edits."""
+import random
+
+import networkx as nx
+import pytest
+
+from backend import Group, rebuild_relationship_graphs
+
+SEEDS = range(20)
+# Each relationship type keeps one direction, as Group.add_edges requires
+KINDS = {'follows': True, 'friends': False, 'manages': True, 'knows': False}
+
+
+def random_edits(group, rng, steps=200):
+    """Apply 'steps' random add_people/add_edges/remove_edge/remove_people calls, verifying the graphs after each."""
+    names = [f'Person{i} Test' for i in range(30)]
+    for _ in range(steps):
+        operation = rng.random()
+        people = list(group.people)
+        if operation < 0.2:
+            assert group.add_people(rng.sample(names, rng.randint(1, 3))) == []
+        elif operation < 0.6:
+            edges = []
+            for _ in range(rng.randint(1, 4)):
+                relationship = rng.choice(list(KINDS))
+                source, target = rng.sample(names, 2)
+                edges.append((source, target, relationship, KINDS[relationship]))
+            assert group.add_edges(edges) == []
+        elif operation < 0.85 and people:
+            source = rng.choice(people)
+            relationship = rng.choice(list(group.relationships) or ['follows'])
+            targets = group.neighbors(source, relationship) if relationship in group.relationships else []
+            target = rng.choice(targets) if targets and rng.random() < 0.8 else rng.choice(names)
+            group.remove_edge(source, target, relationship)
+        elif people:
+            group.remove_people(rng.sample(people, min(len(people), rng.randint(1, 2))))
+        group.update_relationship_graphs(verify=True)
+
+
+def assert_graphs_match_rebuild(group):
+    kept = dict(group.graphs)
+    rebuild_relationship_graphs(group)
+    assert kept.keys() == group.graphs.keys()
+    for relationship, graph in kept.items():
+        assert nx.utils.graphs_equal(graph, group.graphs[relationship]), relationship
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_random_edits_match_rebuild(seed):
+    rng = random.Random(seed)
+    group = Group()
+    group.update_relationship_graphs()
+    random_edits(group, rng)
+    assert_graphs_match_rebuild(group)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_graphs_built_midway_match_rebuild(seed):
+    """Graphs first built part way through the edits are kept up to date from then on."""
+    rng = random.Random(seed)
+    group = Group()
+    random_edits(group, rng, steps=50)
+    group.update_relationship_graphs()
+    random_edits(group, rng)
+    assert_graphs_match_rebuild(group)
+
+
+def test_verify_detects_stale_graph():
+    group = Group()
+    group.add_edges([('Ann Lee', 'Bob Ray', 'follows', True)])
+    group.update_relationship_graphs()
+    group.graphs['follows'].remove_edge('Ann Lee', 'Bob Ray')
+    with pytest.raises(AssertionError):
+        group.update_relationship_graphs(verify=True)
+
+
+def test_undirected_edge_removed_from_both_ends():
+    group = Group()
+    group.add_edges([('Ann Lee', 'Bob Ray', 'friends', False)])
+    group.update_relationship_graphs()
+    assert group.remove_edge('Bob Ray', 'Ann Lee', 'friends')
+    assert group.graphs['friends'].number_of_edges() == 0
+    assert group.neighbors('Ann Lee', 'friends') == []
+    group.update_relationship_graphs(verify=True)
+
+
+def arc_graph(group, relationships):
+    """The arcs of the given relationship types as a DiGraph, undirected relationships as an arc each way."""
+    graph = nx.DiGraph()
+    graph.add_nodes_from(group.people)
+    for relationship in relationships:
+        graph.add_edges_from((name, target) for name in group.people for target in group.neighbors(name, relationship))
+    return graph
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_find_path_is_shortest(seed):
+    rng = random.Random(seed)
+    group = Group()
+    random_edits(group, rng, steps=100)
+    people = list(group.people)
+    for relationships in (None, ['follows'], ['friends', 'manages']):
+        relationships = [relationship for relationship in relationships or group.relationships if relationship in group.relationships]
+        graph = arc_graph(group, relationships)
+        for _ in range(30):
+            source, target = rng.choice(people), rng.choice(people)
+            path = group.find_path(source, target, relationships)
+            if not nx.has_path(graph, source, target):
+                assert path is None
+                continue
+            assert len(path) == nx.shortest_path_length(graph, source, target)
+            assert [step[0] for step in path] + [target] == [source] + [step[2] for step in path]
+            assert all(group.store.has_edge(name, next_name, relationship) and relationship in relationships for name, relationship, next_name in path)
+
+
+def test_find_path_cache_follows_edits():
+    group = Group()
+    group.add_edges([('Ann Lee', 'Bob Ray', 'follows', True), ('Bob Ray', 'Cy Do', 'follows', True), ('Ann Lee', 'Cy Do', 'friends', False)])
+    assert group.degrees_of_separation('Ann Lee', 'Cy Do') == 1
+    group.remove_edge('Cy Do', 'Ann Lee', 'friends')
+    assert group.degrees_of_separation('Ann Lee', 'Cy Do') == 2
+    assert group.find_path('Cy Do', 'Ann Lee') is None
+    group.remove_person('Bob Ray')
+    assert group.find_path('Ann Lee', 'Cy Do') is None
+
+
+def test_find_path_unknown_relationship():
+    group = Group()
+    group.add_edges([('Ann Lee', 'Bob Ray', 'follows', True)])
+    with pytest.raises(ValueError):
+        group.find_path('Ann Lee', 'Bob Ray', ['folows'])
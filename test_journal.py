@@ -0,0 +1,116 @@
+"""Check that journaled edits are replayed, rolled back and compacted into the group file."""
+import copy
+import os
+import random
+
+import pytest
+
+import backend
+import journal
+from backend import Group
+from test_storage import assert_same_group, path, random_group, records
+
+SEEDS = range(10)
+
+
+def random_edits(group, rng, steps=100):
+    """Apply random edits of every kind the journal records."""
+    for step in range(steps):
+        names = list(group.people)
+        operation = rng.random()
+        if operation < 0.15 or len(names) < 2:
+            assert group.add_people([f'Added{step} Person']) == []
+        elif operation < 0.35:
+            source, target = rng.sample(names, 2)
+            directed = rng.random() < 0.5
+            assert group.add_edges([(source, target, 'follows' if directed else 'friends', directed)]) == []
+        elif operation < 0.5:
+            source = rng.choice(names)
+            relationship = rng.choice(['follows', 'friends'])
+            targets = group.neighbors(source, relationship) if relationship in group.relationships else []
+            if targets:
+                group.remove_edge(source, rng.choice(targets), relationship)
+        elif operation < 0.7:
+            group.people[rng.choice(names)].bio = f'Bio {step}'
+        elif operation < 0.8:
+            person = group.people[rng.choice(names)]
+            person.emails.append(f'email{step}@example.com')
+            person.attribute_changed('emails')
+        elif operation < 0.9:
+            person = group.people[rng.choice(names)]
+            if hasattr(person, 'bio'):
+                del person.bio
+        else:
+            group.remove_person(rng.choice(names))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('filename', ['group.json', 'group.ndjson', 'group.snap'])
+def test_replay(path, seed, filename):
+    random_group(seed).save_group_to_file(path(filename))
+    group = Group(path(filename), journaled=True)
+    random_edits(group, random.Random(seed))
+    group.close_journal()
+    assert os.path.getsize(journal.journal_path(path(filename))) > 0
+    assert_same_group(Group(path(filename)), group)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_compact(path, seed):
+    random_group(seed).save_group_to_file(path('group.json'))
+    group = Group(path('group.json'), journaled=True)
+    random_edits(group, random.Random(seed))
+    group.compact()
+    assert group.journal.size == 0
+    group.close_journal()
+    assert_same_group(Group(path('group.json')), group)
+
+
+def test_compact_past_threshold(path):
+    random_group(0).save_group_to_file(path('group.json'))
+    group = Group(path('group.json'))
+    group.open_journal(path('group.json'), compact_bytes=1000)
+    random_edits(group, random.Random(0))
+    assert group.journal.size <= 1000
+    group.close_journal()
+    assert_same_group(Group(path('group.json')), group)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_replay_up_to_mark(path, seed):
+    """Replaying a journal up to a mark gives the group as it was when the mark was taken."""
+    rng = random.Random(seed)
+    random_group(seed).save_group_to_file(path('group.json'))
+    group = Group(path('group.json'), journaled=True)
+    random_edits(group, rng, steps=30)
+    mark, expected = group.journal.mark(), copy.deepcopy(records(group))
+    random_edits(group, rng, steps=30)
+    group.close_journal()
+    at_mark = Group()
+    backend.load_people_from_file(at_mark, path('group.json'), journal_end=mark)
+    assert records(at_mark) == expected
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_rollback(path, seed):
+    rng = random.Random(seed)
+    random_group(seed).save_group_to_file(path('group.json'))
+    group = Group(path('group.json'), journaled=True)
+    random_edits(group, rng, steps=30)
+    mark, expected = group.journal.mark(), copy.deepcopy(records(group))
+    random_edits(group, rng, steps=30)
+    group.journal.rollback(mark)
+    group.close_journal()
+    assert records(Group(path('group.json'))) == expected
+
+
+def test_torn_final_line_is_skipped(path):
+    random_group(0).save_group_to_file(path('group.json'))
+    group = Group(path('group.json'), journaled=True)
+    group.add_people(['Ann Lee'])
+    group.close_journal()
+    with open(journal.journal_path(path('group.json')), 'a') as file:
+        file.write('{"op": "add_person", "name": "Bob')
+    loaded = Group(path('group.json'))
+    assert list(loaded.people)[-1] == 'Ann Lee'
+    assert len(list(journal.read_journal(journal.journal_path(path('group.json'))))) == 1
@@ -0,0 +1,153 @@
+"""Check merge_group_files against a straightforward merge of the files' saved records."""
+import os
+import random
+
+import pytest
+
+from backend import EMPTY_VALUES, MERGE_CONFLICTS, Group, merge_group_files
+from test_storage import path, records
+
+SEEDS = range(10)
+KINDS = {'follows': 'directed', 'friends': 'undirected'}
+FORMATS = ('json', 'ndjson', 'snap', 'db')
+
+
+def random_file_group(rng, names):
+    """Return a random group over some of 'names', whose attributes often disagree with other such groups."""
+    people = rng.sample(names, rng.randint(2, len(names)))
+    group = Group()
+    assert group.add_people(people) == []
+    for name in people:
+        person = group.people[name]
+        person.emails = rng.sample(['a@example.com', 'b@example.com', 'c@example.com'], rng.randint(0, 2))
+        if rng.random() < 0.5:
+            person.bio = rng.choice(['', 'Likes trains', 'Likes boats'])
+        if rng.random() < 0.5:
+            person.custom_attributes = {'team': rng.choice(['red', 'blue']), rng.choice(['level', 'rank']): rng.randint(1, 3)}
+    edges = []
+    for _ in range(rng.randint(0, 2 * len(people))):
+        source, target = rng.sample(people, 2)
+        relationship = rng.choice(list(KINDS))
+        edges.append((source, target, relationship, KINDS[relationship] == 'directed'))
+    assert group.add_edges(edges) == []
+    return group
+
+
+def save_files(path, rng, count, names):
+    """Save 'count' random groups in random formats; returns their filenames and saved records."""
+    filenames, saved = [], []
+    for i in range(count):
+        group = random_file_group(rng, names)
+        filename = path(f'group{i}.{rng.choice(FORMATS)}')
+        group.save_group_to_file(filename)
+        filenames.append(filename)
+        saved.append(records(group))
+    return filenames, saved
+
+
+def expected_merge(saved, policy):
+    """Merge saved records one attribute at a time; returns (attributes by person, arcs, number of conflicts)."""
+    people, arcs, conflicts = {}, set(), 0
+    for file_records in saved:
+        for name, record in file_records.items():
+            for relationship in KINDS:
+                arcs.update((name, target, relationship) for target in record.get(relationship, ()))
+            attributes = {attr: value for attr, value in record.items() if attr not in KINDS}
+            if name not in people:
+                people[name] = attributes
+                continue
+            current = people[name]
+            for attr, value in attributes.items():
+                if value in EMPTY_VALUES or current.get(attr) == value:
+                    continue
+                if current.get(attr) in EMPTY_VALUES:
+                    current[attr] = value
+                elif policy == 'last_writer_wins':
+                    current[attr] = value
+                    conflicts += 1
+                elif isinstance(value, list):
+                    current[attr] = current[attr] + [item for item in value if item not in current[attr]]
+                elif isinstance(value, dict):
+                    merged = dict(current[attr])
+                    for key, item in value.items():
+                        if key in merged and merged[key] != item:
+                            kept = current.setdefault(MERGE_CONFLICTS, {})
+                            kept[f'{attr}.{key}'] = kept.get(f'{attr}.{key}', []) + [item]
+                            conflicts += 1
+                        merged.setdefault(key, item)
+                    current[attr] = merged
+                else:
+                    kept = current.setdefault(MERGE_CONFLICTS, {})
+                    kept[attr] = kept.get(attr, []) + [value]
+                    conflicts += 1
+    return people, arcs, conflicts
+
+
+def merged_arcs(group):
+    return {(name, target, relationship) for name, record in records(group).items() for relationship in KINDS for target in record.get(relationship, ())}
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('policy', ['last_writer_wins', 'keep_both'])
+def test_merge_matches_expected(path, seed, policy):
+    rng = random.Random(seed)
+    names = [f'Person{i} Test' for i in range(12)]
+    filenames, saved = save_files(path, rng, rng.randint(2, 5), names)
+    group = Group()
+    report = merge_group_files(filenames, group, attributes=policy, processes=1)
+    people, arcs, conflicts = expected_merge(saved, policy)
+    assert {name: {attr: value for attr, value in record.items() if attr not in KINDS} for name, record in records(group).items()} == people
+    assert merged_arcs(group) == arcs
+    assert group.relationships.items() <= KINDS.items()
+    assert report['people_added'] == len(people)
+    assert report['people_added'] + report['people_merged'] == sum(map(len, saved))
+    assert report['arcs_added'] == len(arcs)
+    assert len(report['conflicts']) == conflicts
+    group.update_relationship_graphs(verify=True)
+
+
+@pytest.mark.parametrize('seed', SEEDS[:3])
+def test_parallel_merge_matches_serial(path, seed):
+    filenames, _ = save_files(path, random.Random(seed), 4, [f'Person{i} Test' for i in range(12)])
+    serial, parallel = Group(), Group()
+    assert merge_group_files(filenames, serial, processes=1) == merge_group_files(filenames, parallel, processes=2)
+    assert records(parallel) == records(serial)
+
+
+def test_merge_into_existing_group(path):
+    group = Group()
+    group.add_people(['Ann Lee'])
+    group.people['Ann Lee'].bio = 'Old'
+    other = Group()
+    other.add_edges([('Ann Lee', 'Bob Ray', 'friends', False)])
+    other.people['Ann Lee'].bio = 'New'
+    other.save_group_to_file(path('other.json'))
+    report = merge_group_files([path('other.json')], group, processes=1)
+    assert (report['people_added'], report['people_merged'], report['arcs_added']) == (1, 1, 2)
+    assert report['conflicts'] == [{'person': 'Ann Lee', 'attribute': 'bio', 'file': path('other.json'), 'previous': 'Old', 'incoming': 'New', 'kept': 'New'}]
+    assert group.people['Ann Lee'].bio == 'New'
+    assert group.neighbors('Bob Ray', 'friends') == ['Ann Lee']
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_conflicting_kinds_merge_nothing(path, processes):
+    first, second = Group(), Group()
+    first.add_edges([('Ann Lee', 'Bob Ray', 'knows', True)])
+    second.add_edges([('Cy Do', 'Bob Ray', 'knows', False)])
+    first.save_group_to_file(path('first.json'))
+    second.save_group_to_file(path('second.ndjson'))
+    group = Group()
+    with pytest.raises(AssertionError, match='knows'):
+        merge_group_files([path('first.json'), path('second.ndjson')], group, processes=processes)
+    assert not group.people and not group.relationships
+
+
+@pytest.mark.parametrize('missing', ['missing.json', 'missing.ndjson', 'missing.snap', 'missing.db'])
+@pytest.mark.parametrize('processes', [1, 2])
+def test_missing_file_merges_nothing(path, missing, processes):
+    random_file_group(random.Random(0), ['Ann Lee', 'Bob Ray', 'Cy Do']).save_group_to_file(path('group.json'))
+    group = Group()
+    with pytest.raises(FileNotFoundError):
+        merge_group_files([path('group.json'), path(missing)], group, processes=processes)
+    assert not group.people
+    assert not os.path.exists(path(missing))
@@ -0,0 +1,38 @@
+"""Check the name search index against a plain scan of the names under random edits."""
+import random
+
+import pytest
+
+from backend import Group
+
+SEEDS = range(20)
+FIRST = ['Ann', 'Anna', 'Hannah', 'Bob', 'Robert', 'Cyan', 'Dan']
+# 'nann' matches the trigrams of Hannah Nance without being in the name
+LAST = ['Lee', 'Leeson', 'Kaleen', 'Ray', 'Murray', 'Do', 'Nance']
+
+
+def scan(group, text, limit=None, prefix=False):
+    """Search the names of a group by scanning every one of them."""
+    query = text.lower()
+    if prefix:
+        matches = sorted((name for name in group.people if name.lower().startswith(query)), key=lambda name: (name.lower(), name))
+    else:
+        matches = [name for name in group.people if query in name.lower()]
+    return matches[:limit]
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_search_matches_scan(seed):
+    rng = random.Random(seed)
+    group = Group()
+    # Build the index up front, so every later add and remove updates it in place
+    group.search_names('')
+    for _ in range(100):
+        if rng.random() < 0.7 or not group.people:
+            group.add_people([f'{rng.choice(FIRST)} {rng.choice(LAST)}{rng.randint(0, 9)}'])
+        else:
+            group.remove_person(rng.choice(list(group.people)))
+        text = rng.choice(['', 'a', 'an', 'ann', 'LEE', 'n l', 'ray', 'e1', 'obert m', 'nann', 'zzz'])
+        limit = rng.choice([None, 1, 3])
+        prefix = rng.random() < 0.3
+        assert group.search_names(text, limit, prefix) == scan(group, text, limit, prefix)
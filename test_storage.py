@@ -0,0 +1,139 @@
+"""Check that groups survive a save and load in every storage format."""
+import random
+
+import pytest
+
+import backend
+from backend import Group
+
+SEEDS = range(10)
+JSON_FORMATS = ('group.json', 'group.ndjson', 'group.jsonl')
+
+
+@pytest.fixture
+def path(tmp_path):
+    """Return a function giving the path of a file in a temporary directory, as the string the loaders expect."""
+    return lambda filename: str(tmp_path / filename)
+
+
+def random_group(seed):
+    """Return a random group with attributes, directed and undirected relationships and a layout."""
+    rng = random.Random(seed)
+    names = [f'Person{i} Test' for i in range(rng.randint(2, 25))]
+    group = Group()
+    assert group.add_people(names) == []
+    edges = []
+    for _ in range(rng.randint(0, 3 * len(names))):
+        source, target = rng.sample(names, 2)
+        directed = rng.random() < 0.5
+        edges.append((source, target, 'follows' if directed else 'friends', directed))
+    assert group.add_edges(edges) == []
+    for name in names:
+        person = group.people[name]
+        person.emails = [f'{name.split()[0].lower()}@{domain}.com' for domain in rng.sample(['a', 'b', 'c'], rng.randint(0, 2))]
+        person.links = [f'https://example.com/{i}' for i in range(rng.randint(0, 2))]
+        if rng.random() < 0.5:
+            person.bio = f'Bio of {name} ' * rng.randint(1, 5)
+        if rng.random() < 0.3:
+            person.custom_attributes = {'team': rng.choice(['red', 'blue']), 'level': rng.randint(1, 5)}
+    group.set_relationship_layout('follows', {name: (rng.random(), rng.random()) for name in names}, group.version)
+    return group
+
+
+def records(group):
+    """Return the saved record of every person in the group, by full name."""
+    record = group._record_builder()
+    return {fullname: record(person) for fullname, person in group.people.items()}
+
+
+def assert_same_group(loaded, group):
+    assert dict(loaded.relationships) == group.relationships
+    assert list(loaded.people) == list(group.people)
+    assert records(loaded) == records(group)
+    assert loaded.layouts == group.layouts
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('filename', JSON_FORMATS)
+def test_round_trip(path, seed, filename):
+    group = random_group(seed)
+    group.save_group_to_file(path(filename))
+    assert_same_group(Group(path(filename)), group)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_ndjson_lazy_round_trip(path, seed):
+    group = random_group(seed)
+    group.save_group_to_file(path('group.ndjson'))
+    loaded = Group(path('group.ndjson'), lazy=True)
+    assert all('_pending' in person.__dict__ for person in loaded.people.values())
+    assert_same_group(loaded, group)
+
+
+def test_ndjson_streams_people_in_order(path):
+    group = random_group(0)
+    group.save_group_to_file(path('group.ndjson'))
+    loaded = Group()
+    streamed = []
+    for person in backend.stream_people_from_file(loaded, path('group.ndjson')):
+        assert list(loaded.people) == streamed + [person.fullname]
+        streamed.append(person.fullname)
+    assert streamed == list(group.people)
+
+
+def test_ndjson_without_header(path):
+    with open(path('group.ndjson'), 'w') as file:
+        file.write('{"fullname": "Ann Lee"}\n')
+    with pytest.raises(AssertionError):
+        Group(path('group.ndjson'))
+
+
+@pytest.mark.parametrize('source, destination', [('group.json', 'group.ndjson'), ('group.ndjson', 'group.json')])
+def test_convert_json_and_ndjson(path, source, destination):
+    group = random_group(1)
+    group.save_group_to_file(path(source))
+    backend.convert_group_file(path(source), path(destination))
+    assert_same_group(Group(path(destination)), group)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_snapshot_round_trip(path, seed):
+    group = random_group(seed)
+    group.save_group_to_file(path('group.snap'))
+    loaded = Group(path('group.snap'))
+    assert all('_pending' in person.__dict__ for person in loaded.people.values())
+    assert_same_group(loaded, group)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_snapshot_edit_and_resave(path, seed):
+    """Edits to a lazily opened snapshot survive saving it over its own file."""
+    rng = random.Random(seed)
+    random_group(seed).save_group_to_file(path('group.snap'))
+    loaded = Group(path('group.snap'))
+    names = list(loaded.people)
+    loaded.people[rng.choice(names)].bio = 'Edited'
+    loaded.add_edge(*rng.sample(names, 2), 'friends')
+    loaded.remove_people(rng.sample(names, 1))
+    loaded.save_group_to_file(path('group.snap'))
+    assert_same_group(Group(path('group.snap')), loaded)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_snapshot_merged_into_group(path, seed):
+    """A snapshot loaded into a group that already has people is merged in eagerly."""
+    group = random_group(seed)
+    group.save_group_to_file(path('group.snap'))
+    loaded = Group()
+    loaded.add_people(['Ann Lee'])
+    backend.load_people_from_file(loaded, path('group.snap'))
+    assert list(loaded.people) == ['Ann Lee'] + list(group.people)
+    assert {name: record for name, record in records(loaded).items() if name != 'Ann Lee'} == records(group)
+
+
+@pytest.mark.parametrize('source, destination', [('group.json', 'group.snap'), ('group.snap', 'group.json')])
+def test_convert_json_and_snapshot(path, source, destination):
+    group = random_group(2)
+    group.save_group_to_file(path(source))
+    backend.convert_group_file(path(source), path(destination))
+    assert_same_group(Group(path(destination)), group)